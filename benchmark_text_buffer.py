@@ -0,0 +1,173 @@
+"""
+PDF Parçalama Mikro-Benchmark
+1000 sayfalık sentetik bir belgede baseline parçalama kodu (tüm metnin += ile
+birleştirilmesi, _split_by_headings, += ile büyüyen current_chunk) ile
+RAGManager'ın akış halindeki parçalaması (_iter_sections -> _split_to_sentences)
+karşılaştırılır. Yeni taraf doğrudan RAGManager metotlarını çalıştırır.
+
+Kullanım:
+    python benchmark_text_buffer.py [sayfa_sayısı] [--no-model]
+
+    --no-model: Embedding modeli yüklenmez, token sayıları karakter sayısından tahmin edilir
+"""
+
+import re
+import sys
+import time
+import random
+
+from rag_manager import RAGManager
+
+WORDS = (
+    "Selçuklu Sultanı Alparslan Malazgirt Ovası Bizans ordusu Anadolu kapıları "
+    "1071 yılında savaş devlet teşkilatı ikta sistemi divan vezir ordu kervansaray "
+    "medrese ticaret yolu beylik fetih antlaşma"
+).split()
+
+
+def make_pages(page_count: int, headings: bool, seed: int = 42):
+    """Sayfa başına ~40 satırlık sentetik ders kitabı metni üret"""
+    rng = random.Random(seed)
+    pages = []
+    for page_num in range(page_count):
+        lines = []
+        for line_num in range(40):
+            if headings and line_num == 0 and page_num % 5 == 0:
+                lines.append(f"{page_num // 5 + 1}. Malazgirt Savaşı ve Sonuçları")
+            else:
+                sentence = " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14)))
+                lines.append(sentence + ".")
+        pages.append("\n".join(lines))
+    return pages
+
+
+# --- Baseline (load_pdf / _chunk_text / _split_by_headings / _split_to_sentences) ---
+
+BASELINE_CHUNK_SIZE = 400
+BASELINE_CHUNK_OVERLAP = 80
+
+
+def baseline_split_by_headings(text):
+    heading_pattern = r'(?:^|\n)(?:\d+\.|[A-Z]\.|\d+\.\d+|[IVX]+\.)\s+[A-ZÇĞIÖŞÜ]'
+    matches = list(re.finditer(heading_pattern, text))
+    if not matches:
+        return text.split('\n\n')
+    sections = []
+    for i, match in enumerate(matches):
+        start = match.start()
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+        section = text[start:end].strip()
+        if section:
+            sections.append(section)
+    return sections
+
+
+def baseline_is_activity_section(text, filter_keywords):
+    text_lower = text.lower()
+    for keyword in filter_keywords:
+        if keyword in text_lower:
+            return True
+    if text.count('?') > 3:
+        return True
+    if len(re.findall(r'\d+\)\s', text)) > 3:
+        return True
+    return False
+
+
+def baseline_split_to_sentences(text):
+    chunks = []
+    sentences = text.replace('\n', ' ').split('. ')
+    current_chunk = ""
+    for sentence in sentences:
+        if len(current_chunk) + len(sentence) > BASELINE_CHUNK_SIZE:
+            if current_chunk:
+                chunks.append({"text": current_chunk.strip(), "source": "", "chunk_id": len(chunks)})
+                overlap_text = current_chunk[-BASELINE_CHUNK_OVERLAP:]
+                current_chunk = overlap_text + " " + sentence
+            else:
+                current_chunk = sentence
+        else:
+            current_chunk += ". " + sentence if current_chunk else sentence
+    if current_chunk:
+        chunks.append({"text": current_chunk.strip(), "source": "", "chunk_id": len(chunks)})
+    return chunks
+
+
+def baseline_sections(pages):
+    full_text = ""
+    for text in pages:
+        full_text += text + "\n"
+    return baseline_split_by_headings(full_text.strip())
+
+
+def baseline_chunks(pages, filter_keywords):
+    chunks = []
+    for section in baseline_sections(pages):
+        if baseline_is_activity_section(section, filter_keywords):
+            continue
+        if len(section) <= BASELINE_CHUNK_SIZE:
+            chunks.append({"text": section.strip(), "source": "", "chunk_id": len(chunks)})
+        else:
+            chunks.extend(baseline_split_to_sentences(section))
+    return chunks
+
+
+# --- RAGManager ---
+
+def manager_sections(manager, pages):
+    return list(manager._iter_sections(enumerate(pages)))
+
+
+def manager_chunks(manager, pages):
+    chunks = []
+    for section in manager._iter_sections(enumerate(pages)):
+        if manager._is_activity_section(section["text"]):
+            continue
+        chunks.extend(manager._split_to_sentences(section))
+    return chunks
+
+
+def timed(func, *args, repeat: int = 3) -> float:
+    """En iyi çalışma süresi (ms)"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    args = [arg for arg in sys.argv[1:] if not arg.startswith("--")]
+    page_count = int(args[0]) if args else 1000
+
+    manager = RAGManager()
+    if "--no-model" in sys.argv:
+        manager.embedder = None
+    else:
+        # Model ve tokenizer süreye dahil edilmez
+        manager._chunk_token_budget()
+
+    print(f"[INFO] {page_count} sayfalık sentetik belge oluşturuluyor...")
+    plain_pages = make_pages(page_count, headings=False)
+    heading_pages = make_pages(page_count, headings=True)
+    print(f"[INFO] {sum(len(page) + 1 for page in plain_pages) / 1e6:.1f} MB metin")
+
+    cases = [
+        ("Bölümler (başlıksız)", baseline_sections, lambda p: manager_sections(manager, p), plain_pages),
+        ("Bölümler (başlıklı)", baseline_sections, lambda p: manager_sections(manager, p), heading_pages),
+        ("Parçalama (başlıksız)", lambda p: baseline_chunks(p, manager.filter_keywords),
+         lambda p: manager_chunks(manager, p), plain_pages),
+        ("Parçalama (başlıklı)", lambda p: baseline_chunks(p, manager.filter_keywords),
+         lambda p: manager_chunks(manager, p), heading_pages),
+    ]
+
+    print(f"\n{'Senaryo':<26}{'Baseline (ms)':>15}{'RAGManager (ms)':>17}{'Oran':>8}")
+    for name, baseline, current, data in cases:
+        baseline_ms = timed(baseline, data)
+        current_ms = timed(current, data)
+        print(f"{name:<26}{baseline_ms:>15.1f}{current_ms:>17.1f}{baseline_ms / current_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
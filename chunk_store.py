@@ -0,0 +1,356 @@
+"""
+Binary Chunk Store
+Chunk'ları pickle yerine sıkıştırılmış ikili formatta saklar:
+- text.bin: Tüm chunk metinleri art arda (UTF-8, sadece sona eklenir)
+- <kolon>.npy: Kolon bazlı metadata (id, metin offset/uzunluk, belge, sıra no, sayfa, başlık)
+- meta.json: Şema sürümü, satır sayısı, blob boyutu, belge ve başlık tabloları
+
+Açılışta dosyalar memory-map edilir (O(1) başlangıç); bir chunk sadece
+istendiğinde (ör. arama sonucu) diskten okunup dict'e dönüştürülür.
+Pickle kullanılmadığı için dosya okurken kod çalıştırılamaz.
+"""
+
+import os
+import json
+import mmap
+import shutil
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+
+SCHEMA_VERSION = 1
+
+# Kolon adı -> dtype (hepsi satır sırasıyla aynı uzunlukta)
+COLUMNS = {
+    "ids": np.int64,  # Vektör id'si (FAISS id'si ile aynı), artan sırada
+    "offsets": np.int64,  # Metnin text.bin içindeki başlangıç byte'ı
+    "lengths": np.int32,  # Metnin byte uzunluğu
+    "docs": np.int32,  # Belge tablosundaki sıra (meta.json -> docs)
+    "ordinals": np.int32,  # Belge içindeki chunk sırası (chunk_id)
+    "page_starts": np.int32,  # Chunk'ın başladığı sayfa (1'den başlar, bilinmiyorsa -1)
+    "page_ends": np.int32,  # Chunk'ın bittiği sayfa
+    "headings": np.int32,  # Başlık tablosundaki sıra (meta.json -> headings), başlıksız ise -1
+}
+
+# Eski store'larda olmayan kolonların varsayılan değeri (belirtilmeyenler 0)
+COLUMN_DEFAULTS = {"page_starts": -1, "page_ends": -1, "headings": -1}
+
+# Blob'daki ölü (silinmiş) metin bu oranı geçince blob sıkıştırılır
+COMPACT_RATIO = 0.5
+COMPACT_MIN_BYTES = 1024 * 1024
+
+
+class ChunkStore:
+    def __init__(self, directory: str):
+        """
+        Boş chunk store (diske dokunmaz). Kayıtlı store'u açmak için ChunkStore.open kullanın.
+
+        Args:
+            directory: Store dosyalarının bulunduğu klasör
+        """
+        self.directory = directory
+        self._columns = {name: np.zeros(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self._docs = []  # [doc_hash, source] listesi
+        self._headings = []  # Başlık yolları ("Ünite > Konu")
+        self._blob = None  # text.bin üzerinde read-only mmap
+        self._blob_size = 0  # text.bin'in geçerli kısmı (sonrası yarım kalmış yazmadır)
+        self._pending = {}  # Henüz kaydedilmemiş chunk'lar: id -> chunk dict
+        self._deleted = set()  # Kayıtlı satırlardan silinenlerin id'leri
+
+    # --- Açma / kaydetme ---
+
+    @classmethod
+    def exists(cls, directory: str) -> bool:
+        """Klasörde kayıtlı bir store var mı"""
+        return os.path.exists(os.path.join(directory, "meta.json"))
+
+    @classmethod
+    def open(cls, directory: str) -> "ChunkStore":
+        """Kayıtlı store'u memory-map ederek aç"""
+        store = cls(directory)
+        store._open_files()
+        return store
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _open_files(self):
+        with open(self._path("meta.json"), 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+
+        if meta.get("version", 0) > SCHEMA_VERSION:
+            raise ValueError(f"Desteklenmeyen chunk store sürümü: {meta.get('version')}")
+
+        count = meta["count"]
+        for name, dtype in COLUMNS.items():
+            path = self._path(f"{name}.npy")
+            if os.path.exists(path):
+                column = np.load(path, mmap_mode='r')
+            else:
+                # Eski sürümde olmayan kolon: varsayılan değerle doldur
+                column = np.full(count, COLUMN_DEFAULTS.get(name, 0), dtype=dtype)
+            if len(column) != count:
+                raise ValueError(f"Chunk store bozuk: {name}.npy {len(column)} satır, beklenen {count}")
+            self._columns[name] = column
+
+        self._docs = meta["docs"]
+        self._headings = meta.get("headings", [])
+        self._blob_size = meta["blob_size"]
+        self._blob = None
+        if self._blob_size > 0:
+            with open(self._path("text.bin"), 'rb') as f:
+                self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _close_files(self):
+        """mmap'leri kapat (Windows'ta açık map'lenmiş dosyanın üzerine yazılamaz)"""
+        self._columns = {name: np.array(column) for name, column in self._columns.items()}
+        if self._blob is not None:
+            self._blob.close()
+            self._blob = None
+
+    def save(self, directory: str = None):
+        """
+        Bekleyen değişiklikleri diske yaz
+        Yeni metinler text.bin'in sonuna eklenir; kolonlar ve meta.json yeniden yazılır.
+
+        Args:
+            directory: Farklı bir klasöre kaydet (ör. yeni database nesli). Mevcut text.bin
+                       oraya hard link ile bağlanır (desteklenmezse kopyalanır); eski klasördeki
+                       meta.json blob_size'ı değişmediği için eski store geçerli kalır.
+        """
+        source_directory = self.directory
+        if directory is not None:
+            self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+
+        keep = np.ones(len(self._columns["ids"]), dtype=bool)
+        if self._deleted:
+            keep = ~np.isin(self._columns["ids"], np.fromiter(self._deleted, dtype=np.int64))
+        base = {name: np.array(column[keep]) for name, column in self._columns.items()}
+
+        # Belge tablosunu kullanılan belgelerle yeniden kur
+        doc_index = {}
+        docs = []
+
+        def doc_slot(doc_hash, source):
+            key = (doc_hash, source)
+            if key not in doc_index:
+                doc_index[key] = len(docs)
+                docs.append([doc_hash, source])
+            return doc_index[key]
+
+        base["docs"] = np.array(
+            [doc_slot(*self._docs[d]) for d in base["docs"].tolist()], dtype=np.int32
+        )
+
+        # Başlık tablosu da aynı şekilde kullanılanlarla yeniden kurulur
+        heading_index = {}
+        headings = []
+
+        def heading_slot(heading):
+            if not heading:
+                return -1
+            if heading not in heading_index:
+                heading_index[heading] = len(headings)
+                headings.append(heading)
+            return heading_index[heading]
+
+        base["headings"] = np.array(
+            [heading_slot(self._headings[h]) if h >= 0 else -1 for h in base["headings"].tolist()],
+            dtype=np.int32
+        )
+
+        live_bytes = int(base["lengths"].sum()) + sum(
+            len(chunk["text"].encode('utf-8')) for chunk in self._pending.values()
+        )
+        compact = (self._blob_size > COMPACT_MIN_BYTES and
+                   self._blob_size - int(base["lengths"].sum()) > COMPACT_RATIO * max(live_bytes, 1))
+
+        old_texts = None
+        if compact:
+            old_texts = [self._read_text(int(o), int(n)) for o, n in zip(base["offsets"], base["lengths"])]
+
+        self._close_files()
+
+        if self._blob_size > 0 and os.path.abspath(source_directory) != os.path.abspath(self.directory):
+            source_blob = os.path.join(source_directory, "text.bin")
+            if os.path.exists(self._path("text.bin")):
+                os.remove(self._path("text.bin"))
+            try:
+                os.link(source_blob, self._path("text.bin"))
+            except OSError:
+                shutil.copyfile(source_blob, self._path("text.bin"))
+
+        if compact:
+            blob_size = 0
+            tmp_path = self._path("text.bin.tmp")
+            with open(tmp_path, 'wb') as f:
+                for i, text in enumerate(old_texts):
+                    data = text.encode('utf-8')
+                    base["offsets"][i] = blob_size
+                    f.write(data)
+                    blob_size += len(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self._path("text.bin"))
+        else:
+            blob_size = self._blob_size
+
+        # Yeni metinleri blob'un sonuna ekle (yarım kalmış eski yazmalar kesilir)
+        new_rows = {name: [] for name in COLUMNS}
+        mode = 'r+b' if os.path.exists(self._path("text.bin")) else 'wb'
+        with open(self._path("text.bin"), mode) as f:
+            f.truncate(blob_size)
+            f.seek(blob_size)
+            for vector_id, chunk in self._pending.items():
+                data = chunk["text"].encode('utf-8')
+                f.write(data)
+                new_rows["ids"].append(vector_id)
+                new_rows["offsets"].append(blob_size)
+                new_rows["lengths"].append(len(data))
+                new_rows["docs"].append(doc_slot(chunk.get("doc_hash", ""), chunk.get("source", "")))
+                new_rows["ordinals"].append(chunk.get("chunk_id", 0))
+                page_start, page_end = chunk.get("page_start"), chunk.get("page_end")
+                new_rows["page_starts"].append(-1 if page_start is None else page_start)
+                new_rows["page_ends"].append(-1 if page_end is None else page_end)
+                new_rows["headings"].append(heading_slot(chunk.get("heading", "")))
+                blob_size += len(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+        columns = {
+            name: np.concatenate([base[name], np.array(new_rows[name], dtype=dtype)])
+            for name, dtype in COLUMNS.items()
+        }
+        order = np.argsort(columns["ids"], kind='stable')
+        columns = {name: column[order] for name, column in columns.items()}
+
+        for name, column in columns.items():
+            tmp_path = self._path(f"{name}.tmp.npy")
+            np.save(tmp_path, column)
+            os.replace(tmp_path, self._path(f"{name}.npy"))
+
+        meta = {
+            "version": SCHEMA_VERSION,
+            "count": int(len(columns["ids"])),
+            "blob_size": blob_size,
+            "docs": docs,
+            "headings": headings,
+        }
+        tmp_path = self._path("meta.json.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path("meta.json"))
+
+        self._pending = {}
+        self._deleted = set()
+        self._open_files()
+
+    # --- Okuma ---
+
+    def _read_text(self, offset: int, length: int) -> str:
+        return self._blob[offset:offset + length].decode('utf-8')
+
+    def _row(self, vector_id: int) -> Optional[int]:
+        """Kayıtlı satırlarda id'nin sırası (ikili arama), yoksa None"""
+        ids = self._columns["ids"]
+        row = int(np.searchsorted(ids, vector_id))
+        if row < len(ids) and ids[row] == vector_id and vector_id not in self._deleted:
+            return row
+        return None
+
+    def _materialize(self, row: int) -> Dict:
+        doc_hash, source = self._docs[int(self._columns["docs"][row])]
+        page_start = int(self._columns["page_starts"][row])
+        page_end = int(self._columns["page_ends"][row])
+        heading = int(self._columns["headings"][row])
+        return {
+            "text": self._read_text(int(self._columns["offsets"][row]), int(self._columns["lengths"][row])),
+            "source": source,
+            "chunk_id": int(self._columns["ordinals"][row]),
+            "doc_hash": doc_hash,
+            "page_start": page_start if page_start >= 0 else None,
+            "page_end": page_end if page_end >= 0 else None,
+            "heading": self._headings[heading] if heading >= 0 else "",
+        }
+
+    def __len__(self) -> int:
+        return len(self._columns["ids"]) - len(self._deleted) + len(self._pending)
+
+    def __contains__(self, vector_id) -> bool:
+        vector_id = int(vector_id)
+        return vector_id in self._pending or self._row(vector_id) is not None
+
+    def __getitem__(self, vector_id) -> Dict:
+        vector_id = int(vector_id)
+        if vector_id in self._pending:
+            return dict(self._pending[vector_id])
+        row = self._row(vector_id)
+        if row is None:
+            raise KeyError(vector_id)
+        return self._materialize(row)
+
+    def get(self, vector_id, default=None):
+        try:
+            return self[vector_id]
+        except KeyError:
+            return default
+
+    def ids(self) -> np.ndarray:
+        """Tüm chunk id'leri (artan sırada)"""
+        base = self._columns["ids"]
+        if self._deleted:
+            base = base[~np.isin(base, np.fromiter(self._deleted, dtype=np.int64))]
+        pending = np.fromiter(self._pending.keys(), dtype=np.int64, count=len(self._pending))
+        return np.sort(np.concatenate([np.asarray(base), pending]))
+
+    def max_id(self) -> int:
+        """En büyük chunk id'si (boşsa -1)"""
+        ids = self.ids()
+        return int(ids[-1]) if len(ids) else -1
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.ids().tolist())
+
+    def keys(self) -> Iterator[int]:
+        return iter(self)
+
+    def items(self) -> Iterator:
+        for vector_id in self:
+            yield vector_id, self[vector_id]
+
+    def values(self) -> Iterator[Dict]:
+        for _, chunk in self.items():
+            yield chunk
+
+    # --- Yazma ---
+
+    def __setitem__(self, vector_id, chunk: Dict):
+        vector_id = int(vector_id)
+        if self._row(vector_id) is not None:
+            self._deleted.add(vector_id)
+        self._pending[vector_id] = dict(chunk)
+
+    def pop(self, vector_id, default=None):
+        vector_id = int(vector_id)
+        if vector_id in self._pending:
+            return self._pending.pop(vector_id)
+        row = self._row(vector_id)
+        if row is None:
+            return default
+        chunk = self._materialize(row)
+        self._deleted.add(vector_id)
+        return chunk
+
+    def update(self, chunks: Dict[int, Dict]):
+        for vector_id, chunk in chunks.items():
+            self[vector_id] = chunk
+
+    def clear_files(self):
+        """Store dosyalarını diskten sil ve store'u boşalt"""
+        self._close_files()
+        for name in list(COLUMNS) + ["text.bin", "meta.json"]:
+            path = self._path(f"{name}.npy") if name in COLUMNS else self._path(name)
+            if os.path.exists(path):
+                os.remove(path)
+        self.__init__(self.directory)
@@ -36,6 +36,25 @@ CHAT_CONFIG = {
     "save_path": "chat_history.json",
 }
 
+# RAG Ayarları
+RAG_CONFIG = {
+    "embedding_model": "emrecan/bert-base-turkish-cased-mean-nli-stsb-tr",
+    "embedding_backend": "torch",  # torch (fp32), torch_int8 (CPU'da hızlı) veya onnx (ONNX Runtime)
+    "embedding_cache": True,  # Değişmemiş parçalar yeniden yüklemede tekrar encode edilmez
+    "index_type": "auto",  # auto, flat, ivf_flat, ivf_pq, hnsw
+    "nprobe": 16,  # IVF: sorgu başına taranan küme (artırınca recall artar, hız düşer)
+    "ef_search": 64,  # HNSW: sorgu aday listesi boyutu
+    "metric": "cosine",  # cosine (normalize + inner product) veya l2
+    "similarity_threshold": None,  # None: ölçüte göre varsayılan (cosine 0.4, l2 0.3)
+    "cache_size": 256,  # Tekrarlanan sorular için sorgu vektörü / sonuç önbelleği
+    "cache_ttl": 3600,  # Önbellek kaydı ömrü (saniye)
+    "search_mode": "hybrid",  # hybrid (FAISS + BM25), dense (RAGManager varsayılanı) veya sparse
+    # Cross-encoder ile yeniden sıralama (None: kapalı), ör. "cross-encoder/mmarco-mMiniLMv2-L12-H384-v1"
+    "reranker_model": None,
+    "rerank_candidates": 50,  # Yeniden sıralanacak aday sayısı
+    "rerank_budget_ms": 300,  # Aşılırsa arama sırası kullanılır
+}
+
 # GUI Ayarları
 GUI_CONFIG = {
     "window_width": 900,
@@ -51,4 +70,20 @@ SADECE TÜRKÇE yanıt ver. Başka dil kullanma.
 Yanıtlarını tam olarak tamamla, yarıda kesme.
 Cevaplarını net, kısa ve öz tut.
 Bilinmediğini söylemekten korkmayın.""",
+    # RAG chatbot'u: talimatlar sabit system mesajındadır, KV önbelleği bir kez hesaplanıp her soruda kullanılır
+    "rag_document": """Sen Türkçe tarih konularında uzman bir yapay zeka asistanısın. Sana bir TARİH KİTABI belgesi verildi.
+
+KATÎ KURALLAR:
+1. SADECE TÜRKÇE cevap ver - Hiçbir Çince (中文), İngilizce, Korece, Japonca karakteri KULLANMA
+2. Aşağıdaki BELGE bilgilerine AYNEN dayanarak cevap ver
+3. Belgede bilgi YOKSA: "Bu bilgi belgede mevcut değil" de, kesinlikle bilgi UYDURMA
+4. Etkinlik/alıştırma soruları OLMASIN - sadece bilgi odaklı cevap
+5. Cevabını EKSIKSIZ bitir, yarıda kesme
+6. Kısa ve net cevap ver (2-4 cümle yeterli)""",
+    "rag_general": """Sen Türkçe tarih konularında uzman bir yapay zeka asistanısın.
+
+KURALLAR:
+1. SADECE TÜRKÇE cevap ver
+2. Eğer belgede bu konu yoksa: "Bu konu hakkında yüklenen belgede bilgi bulamadım" de
+3. Bilgi uydurma, sadece genel tarih bilgilerini kullan""",
 }
@@ -0,0 +1,150 @@
+"""
+Sohbet Oturumu (Turlar Arası KV Önbelleği)
+Her turda son mesajlar yeniden token'lanıp baştan prefill edilmek yerine modelin
+KV önbelleği turlar arasında saklanır:
+
+- Önbelleğin hangi token'ları içerdiği (cache_ids) tutulur; yeni prompt ile en uzun
+  ortak başlangıç bulunur, önbellek oraya kırpılır (crop) ve sadece kalan kısım prefill edilir
+- Geçmişte ham kullanıcı sorusu tutulur (önceki turların belge context'i sonraki prompt'lara
+  taşınmaz); bu yüzden her turda önceki soru-cevap ve yeni mesaj prefill edilir, daha
+  eski mesajlar önbellekten gelir
+- Mesaj penceresi histerezisli kayar: pencere max_messages'ı aşınca tek tek değil, bir
+  seferde min_messages'a inecek kadar eski mesaj atılır. Pencerenin başı değişince önbellek
+  sadece talimat (system) kısmına kadar geçerlidir; böylece tam yeniden hesaplama her
+  turda değil, birkaç turda bir yapılır
+- Talimat önbelleği (prefix) daha uzun bir ortak başlangıç sağlıyorsa onun kopyası kullanılır
+"""
+
+import copy
+from typing import Dict, List, Optional, Sequence, Tuple
+
+
+def crop_cache(cache, length: int) -> bool:
+    """
+    KV önbelleğini ilk length token'a kırp
+
+    DynamicCache.crop olmayan transformers sürümlerinde (ör. 4.38) key / value
+    tensörleri doğrudan kesilir.
+
+    Returns:
+        bool: Kırpılabildiyse True
+    """
+    if hasattr(cache, "crop"):
+        cache.crop(length)
+        return True
+    if not (hasattr(cache, "key_cache") and hasattr(cache, "value_cache")):
+        return False
+    # Katman başına (batch, head, token, boyut) tensörler
+    cache.key_cache = [keys[..., :length, :] for keys in cache.key_cache]
+    cache.value_cache = [values[..., :length, :] for values in cache.value_cache]
+    for name in ("seen_tokens", "_seen_tokens"):
+        if hasattr(cache, name):
+            setattr(cache, name, length)
+    return True
+
+
+def common_prefix_length(a: Sequence[int], b: Sequence[int]) -> int:
+    """İki token dizisinin ortak başlangıç uzunluğu"""
+    n = min(len(a), len(b))
+    i = 0
+    while i < n and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class ConversationSession:
+    def __init__(self, max_messages: int = 9, min_messages: int = 5):
+        """
+        KV önbelleğini turlar arasında taşıyan sohbet oturumu
+        Mesaj sayıları yeni kullanıcı mesajını da içerir; pencere kullanıcı mesajıyla
+        başlayıp bittiği için tek sayı olmalıdır (5 = önceki 2 soru-cevap + yeni soru).
+
+        Args:
+            max_messages: Prompt'a giren en fazla mesaj
+            min_messages: Pencere taşınca kalacak mesaj sayısı
+        """
+        self.max_messages = max_messages
+        self.min_messages = min_messages
+        self.messages: List[Dict] = []  # Geçmiş soru-cevaplar (ham soru, system hariç)
+        self.cache = None  # Son turun KV önbelleği (üretilen cevap dahil)
+        self.cache_ids: List[int] = []  # Önbellekteki token'lar
+        self.reused_tokens = 0  # Son turda önbellekten gelen token sayısı
+        self.prefill_tokens = 0  # Son turda prefill edilen token sayısı
+        self._crop_warned = False
+
+    def window(self, message: Dict) -> List[Dict]:
+        """
+        Yeni mesajla birlikte prompt'a girecek mesajlar
+        Pencere taşarsa yeni mesajla birlikte min_messages mesaj kalacak şekilde eski mesajlar atılır
+        (geçmiş soru-cevap çiftlerinden oluştuğu için kalan kısım kullanıcı mesajıyla başlar).
+        """
+        if len(self.messages) + 1 > self.max_messages:
+            keep = self.messages[-(self.min_messages - 1):] if self.min_messages > 1 else []
+            while keep and keep[0]["role"] != "user":
+                keep = keep[1:]
+            self.messages = keep
+        return [dict(msg) for msg in self.messages] + [dict(message)]
+
+    def reuse(self, input_ids: List[int], prefix: Optional[Tuple[List[int], object]] = None):
+        """
+        Prompt için kullanılabilecek KV önbelleği
+
+        Args:
+            input_ids: Tam prompt'un token id'leri
+            prefix: (token id'leri, önbellek) talimat önbelleği (kopyalanarak kullanılır)
+
+        Returns:
+            Önbellek (ilk kısmı input_ids ile aynı, generate tarafından genişletilir) veya None
+        """
+        # En az bir token prefill edilmeli
+        limit = len(input_ids) - 1
+        common = min(common_prefix_length(self.cache_ids, input_ids), limit)
+
+        prefix_length = 0
+        prefix_cache = None
+        if prefix is not None:
+            prefix_ids, prefix_cache = prefix
+            if len(prefix_ids) <= limit and common_prefix_length(prefix_ids, input_ids) == len(prefix_ids):
+                prefix_length = len(prefix_ids)
+
+        cache = None
+        if prefix_length and prefix_length >= common:
+            cache = copy.deepcopy(prefix_cache)
+            common = prefix_length
+        elif common > 0 and self.cache is not None and crop_cache(self.cache, common):
+            cache = self.cache
+        else:
+            if common > 0 and self.cache is not None and not self._crop_warned:
+                print("[WARNING] KV önbelleği kırpılamıyor (bu transformers sürümünde desteklenmiyor), "
+                      "turlar arası önbellek kullanılmıyor")
+                self._crop_warned = True
+            common = 0
+
+        # Kullanılmayan önbellek bırakılır (bellek)
+        self.cache = None
+        self.cache_ids = []
+        self.reused_tokens = common
+        self.prefill_tokens = len(input_ids) - common
+        return cache
+
+    def commit(self, user_message: Dict, assistant_message: Dict, cache, sequence_ids: List[int]):
+        """
+        Tamamlanan turu kaydet
+
+        Args:
+            user_message: Geçmişte tutulacak kullanıcı mesajı (ham soru)
+            assistant_message: Modelin cevabı
+            cache: generate sonrası önbellek (prompt + üretilen token'lar)
+            sequence_ids: generate çıktısı (prompt + üretilen token'lar)
+        """
+        self.messages.append(dict(user_message))
+        self.messages.append(dict(assistant_message))
+        if cache is not None and hasattr(cache, "get_seq_length"):
+            self.cache = cache
+            self.cache_ids = list(sequence_ids[:cache.get_seq_length()])
+
+    def reset(self):
+        """Oturumu ve önbelleği temizle"""
+        self.messages = []
+        self.cache = None
+        self.cache_ids = []
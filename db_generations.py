@@ -0,0 +1,227 @@
+"""
+Vektör Database Nesilleri
+Her kayıt yeni bir nesil klasörüne (vector_db/gen-000001, gen-000002, ...) yazılır:
+- index.faiss, documents.json, chunks/ (ChunkStore)
+- manifest.json: Şema sürümü, embedding modeli, boyut, parça sayısı ve dosya checksum'ları
+
+Nesil tamamen yazılıp fsync edildikten sonra vector_db/CURRENT dosyası
+temp dosya + rename ile yeni nesli gösterecek şekilde güncellenir. Kayıt yarıda
+kesilirse CURRENT eski nesli göstermeye devam eder; index ve chunk'lar hep
+aynı nesilden yüklenir.
+"""
+
+import os
+import json
+import shutil
+import hashlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SCHEMA_VERSION = 1
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+GENERATION_PREFIX = "gen-"
+
+# Bu boyuttan küçük dosyaların checksum'ı her açılışta doğrulanır,
+# büyükler (ör. index.faiss) için sadece boyut kontrol edilir (full=True hariç)
+CHECKSUM_MAX_BYTES = 64 * 1024 * 1024
+
+
+def fsync_file(path: str):
+    """Dosyanın içeriğini diske yazdır"""
+    with open(path, 'rb+') as f:
+        os.fsync(f.fileno())
+
+
+def fsync_directory(path: str):
+    """Klasör girdilerini (rename) diske yazdır (Windows'ta desteklenmez, atlanır)"""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_json_atomic(path: str, data):
+    """JSON dosyasını temp dosya + rename ile yaz (yarım dosya oluşmaz)"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def file_sha256(path: str) -> str:
+    """Dosyanın SHA-256 özeti"""
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def _generation_number(name: str) -> int:
+    try:
+        return int(name[len(GENERATION_PREFIX):])
+    except ValueError:
+        return -1
+
+
+def list_generations(root: str) -> List[str]:
+    """Nesil klasörü adları (en yeni önce)"""
+    if not os.path.isdir(root):
+        return []
+    names = [name for name in os.listdir(root)
+             if name.startswith(GENERATION_PREFIX) and _generation_number(name) >= 0
+             and os.path.isdir(os.path.join(root, name))]
+    return sorted(names, key=_generation_number, reverse=True)
+
+
+def read_current(root: str) -> Optional[str]:
+    """CURRENT dosyasının gösterdiği nesil adı (yoksa None)"""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), 'r', encoding='utf-8') as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def new_generation(root: str) -> str:
+    """Sonraki nesil klasörünü oluştur ve yolunu döndür"""
+    names = list_generations(root)
+    number = _generation_number(names[0]) + 1 if names else 1
+    path = os.path.join(root, f"{GENERATION_PREFIX}{number:06d}")
+    if os.path.exists(path):
+        shutil.rmtree(path)  # Önceki yarım kalmış kayıt
+    os.makedirs(path)
+    return path
+
+
+def read_manifest(directory: str) -> Optional[Dict]:
+    """Klasördeki manifest.json (yoksa veya okunamazsa None)"""
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_manifest(gen_dir: str, info: Dict, append_only: Iterable[str] = ()) -> Dict:
+    """
+    Nesildeki tüm dosyaları fsync et, boyut/checksum'larını hesapla ve manifest'i yaz
+
+    Args:
+        gen_dir: Nesil klasörü
+        info: Manifest'e eklenecek bilgiler (embedding modeli, boyut, parça sayısı...)
+        append_only: Sadece sonuna eklenen dosyalar (göreli yol). Sonraki nesiller aynı dosyaya
+                     hard link ile ekleme yapabildiği için bunlarda checksum yerine
+                     "en az bu boyutta" kontrolü yapılır.
+
+    Returns:
+        Dict: Yazılan manifest
+    """
+    append_only = set(append_only)
+    files = {}
+    for directory, _, names in os.walk(gen_dir):
+        for name in names:
+            path = os.path.join(directory, name)
+            rel_path = os.path.relpath(path, gen_dir).replace(os.sep, "/")
+            if rel_path == MANIFEST_FILE or rel_path.endswith(".tmp"):
+                continue
+            fsync_file(path)
+            entry = {"size": os.path.getsize(path)}
+            if rel_path in append_only:
+                entry["append_only"] = True
+            else:
+                entry["sha256"] = file_sha256(path)
+            files[rel_path] = entry
+
+    manifest = dict(info)
+    manifest["schema_version"] = SCHEMA_VERSION
+    manifest["generation"] = os.path.basename(gen_dir)
+    manifest["files"] = files
+    write_json_atomic(os.path.join(gen_dir, MANIFEST_FILE), manifest)
+    fsync_directory(gen_dir)
+    return manifest
+
+
+def verify_generation(gen_dir: str, manifest: Dict, full: bool = False) -> Optional[str]:
+    """
+    Nesildeki dosyaları manifest'e göre doğrula
+
+    Args:
+        full: True ise büyük dosyaların checksum'ı da hesaplanır
+
+    Returns:
+        Optional[str]: Hata açıklaması, nesil sağlamsa None
+    """
+    if manifest.get("schema_version", 0) > SCHEMA_VERSION:
+        return f"desteklenmeyen şema sürümü: {manifest.get('schema_version')}"
+
+    for rel_path, entry in manifest.get("files", {}).items():
+        path = os.path.join(gen_dir, *rel_path.split("/"))
+        if not os.path.exists(path):
+            return f"{rel_path} eksik"
+        size = os.path.getsize(path)
+        if entry.get("append_only"):
+            if size < entry["size"]:
+                return f"{rel_path} kısalmış ({size} < {entry['size']})"
+            continue
+        if size != entry["size"]:
+            return f"{rel_path} boyutu uyuşmuyor ({size} != {entry['size']})"
+        if (full or size <= CHECKSUM_MAX_BYTES) and file_sha256(path) != entry["sha256"]:
+            return f"{rel_path} checksum uyuşmuyor"
+    return None
+
+
+def find_generation(root: str, full: bool = False) -> Tuple[Optional[str], Optional[Dict]]:
+    """
+    Yüklenecek nesli bul: önce CURRENT, bozuksa ondan önceki en yeni sağlam nesil
+    (CURRENT'tan yeni nesiller yayınlanmamış, yarıda kalmış kayıtlardır ve atlanır)
+
+    Returns:
+        Tuple: (nesil klasörü, manifest) veya (None, None)
+    """
+    current = read_current(root)
+    candidates = list_generations(root)
+    if current in candidates:
+        candidates = [name for name in candidates
+                      if _generation_number(name) < _generation_number(current)]
+        candidates.insert(0, current)
+
+    for name in candidates:
+        gen_dir = os.path.join(root, name)
+        manifest = read_manifest(gen_dir)
+        if manifest is None:
+            continue  # Yarım kalmış kayıt
+        error = verify_generation(gen_dir, manifest, full=full)
+        if error is None:
+            if name != current:
+                print(f"[WARNING] CURRENT nesli kullanılamıyor, önceki sağlam nesil yükleniyor: {name}")
+            return gen_dir, manifest
+        print(f"[WARNING] Database nesli bozuk, atlanıyor: {name} ({error})")
+    return None, None
+
+
+def publish(root: str, gen_dir: str):
+    """CURRENT'ı atomik olarak yeni nesle çevir"""
+    tmp_path = os.path.join(root, CURRENT_FILE + ".tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(os.path.basename(gen_dir))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+    fsync_directory(root)
+
+
+def prune(root: str, keep: Iterable[str]):
+    """Tutulacaklar dışındaki nesil klasörlerini sil"""
+    keep = {os.path.basename(os.path.normpath(name)) for name in keep if name}
+    for name in list_generations(root):
+        if name not in keep:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
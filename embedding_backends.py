@@ -0,0 +1,131 @@
+"""
+Embedding Backend'leri
+Aynı sentence-transformers modelini farklı çalışma zamanlarıyla yükler:
+- torch: Tam hassasiyet (fp32) PyTorch modeli (varsayılan)
+- torch_int8: Linear katmanları int8'e dinamik quantize edilmiş PyTorch modeli (CPU)
+- onnx: ONNX Runtime (sentence-transformers >= 3.2 backend="onnx", optimum[onnxruntime] gerekir)
+
+Hepsi aynı encode / get_sentence_embedding_dimension arayüzünü sunar.
+Quantize edilmiş modellerin fp32'ye göre sapması parity_check ile ölçülür.
+
+Kullanım (parity raporu):
+    python embedding_backends.py [backend] [model]
+"""
+
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+try:
+    from sentence_transformers import SentenceTransformer
+except ImportError:
+    print("[WARNING] sentence-transformers eksik. Yüklemek için: pip install sentence-transformers")
+
+BACKENDS = ("torch", "torch_int8", "onnx")
+
+
+def load_encoder(model_name: str, backend: str = "torch") -> Tuple[object, str]:
+    """
+    Embedding modelini istenen backend ile yükle
+    Backend kullanılamıyorsa (ör. optimum / onnxruntime yok) uyarı verilip fp32 torch'a düşülür;
+    bu yüzden gerçekte yüklenen backend de döndürülür (manifest / önbellek anahtarı için).
+
+    Args:
+        model_name: sentence-transformers model adı veya yolu
+        backend: "torch", "torch_int8" veya "onnx"
+
+    Returns:
+        Tuple: (encode() ile kullanılabilir SentenceTransformer, yüklenen backend)
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Geçersiz embedding backend'i: {backend} (seçenekler: {', '.join(BACKENDS)})")
+
+    if backend == "onnx":
+        try:
+            return SentenceTransformer(model_name, device="cpu", backend="onnx"), "onnx"
+        except (TypeError, ImportError, ValueError) as e:
+            # TypeError: backend parametresi olmayan eski sentence-transformers (< 3.2)
+            print(f"[WARNING] ONNX backend'i kullanılamıyor ({str(e)}), PyTorch ile devam ediliyor. "
+                  "Gerekli paketler: pip install \"sentence-transformers[onnx]>=3.2\"")
+            return SentenceTransformer(model_name), "torch"
+
+    if backend == "torch_int8":
+        import torch
+        model = SentenceTransformer(model_name, device="cpu")
+        model.eval()
+        # Ağırlıklar int8'e çevrilir, aktivasyonlar çalışma anında quantize edilir (sadece CPU)
+        torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        return model, "torch_int8"
+
+    return SentenceTransformer(model_name), "torch"
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def parity_check(reference, candidate, texts: List[str], batch_size: int = 32) -> Dict[str, float]:
+    """
+    İki encoder'ın aynı metinlerdeki çıktılarını karşılaştır
+
+    Args:
+        reference: Referans model (fp32 torch)
+        candidate: Karşılaştırılan model (ör. torch_int8 / onnx)
+        texts: Örnek metinler
+
+    Returns:
+        Dict: mean_cosine, min_cosine (aynı metnin iki vektörü arasındaki kosinüs),
+              max_drift (1 - min_cosine), reference_ms, candidate_ms, speedup
+    """
+    start = time.perf_counter()
+    ref = np.asarray(reference.encode(texts, batch_size=batch_size, show_progress_bar=False), dtype='float32')
+    reference_ms = (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    cand = np.asarray(candidate.encode(texts, batch_size=batch_size, show_progress_bar=False), dtype='float32')
+    candidate_ms = (time.perf_counter() - start) * 1000
+
+    cosines = np.sum(_normalize(ref) * _normalize(cand), axis=1)
+    return {
+        "texts": len(texts),
+        "mean_cosine": float(cosines.mean()),
+        "min_cosine": float(cosines.min()),
+        "max_drift": float(1 - cosines.min()),
+        "reference_ms": reference_ms,
+        "candidate_ms": candidate_ms,
+        "speedup": reference_ms / candidate_ms if candidate_ms else 0.0,
+    }
+
+
+def print_parity_report(backend: str, report: Dict[str, float]):
+    """parity_check sonucunu yazdır"""
+    print(f"[INFO] {backend} / fp32 karşılaştırması ({report['texts']} metin):")
+    print(f"  Ortalama kosinüs: {report['mean_cosine']:.5f}, en düşük: {report['min_cosine']:.5f} "
+          f"(en büyük sapma {report['max_drift']:.5f})")
+    print(f"  Süre: fp32 {report['reference_ms']:.0f} ms, {backend} {report['candidate_ms']:.0f} ms "
+          f"({report['speedup']:.2f}x)")
+
+
+def main():
+    backend = sys.argv[1] if len(sys.argv) > 1 else "torch_int8"
+    model_name = sys.argv[2] if len(sys.argv) > 2 else "emrecan/bert-base-turkish-cased-mean-nli-stsb-tr"
+
+    texts = [
+        "Malazgirt Savaşı 1071 yılında Selçuklu Sultanı Alparslan ile Bizans İmparatoru Romen Diyojen arasında yapıldı.",
+        "Savaşın sonunda Anadolu'nun kapıları Türklere açıldı.",
+        "İkta sistemi, toprağın gelirinin hizmet karşılığında devlet görevlilerine bırakılmasıdır.",
+        "Kervansaraylar ticaret yolları üzerinde tüccarların konaklaması için yapılmıştır.",
+    ] * 16
+
+    reference, _ = load_encoder(model_name, "torch")
+    candidate, loaded = load_encoder(model_name, backend)
+    reference.encode(texts[:4], show_progress_bar=False)  # Isınma
+    candidate.encode(texts[:4], show_progress_bar=False)
+    print_parity_report(loaded, parity_check(reference, candidate, texts))
+
+
+if __name__ == "__main__":
+    main()
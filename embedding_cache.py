@@ -0,0 +1,110 @@
+"""
+Kalıcı Embedding Önbelleği
+Parça metninin (normalize edilmiş) SHA-256 özeti + model anahtarı -> vektör eşlemesini
+SQLite'ta saklar. Bir PDF'in az değişmiş yeni baskısı yüklendiğinde sadece değişen
+parçalar encoder'dan geçer; aynı metinli parçaların vektörü önbellekten okunur.
+"""
+
+import sqlite3
+import hashlib
+import threading
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from query_cache import normalize_query
+
+
+def text_key(text: str) -> bytes:
+    """Parça metninin önbellek anahtarı (NFC + boşluk normalizasyonu sonrası SHA-256)"""
+    return hashlib.sha256(normalize_query(text).encode('utf-8')).digest()
+
+
+class EmbeddingCache:
+    def __init__(self, path: str):
+        """
+        SQLite tabanlı embedding önbelleği
+
+        Args:
+            path: Veritabanı dosyası (yoksa oluşturulur)
+        """
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()  # Arka plan yeniden embed de aynı bağlantıyı kullanır
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_hash BLOB NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        self._conn.commit()
+
+    def get_many(self, model: str, keys: List[bytes]) -> Dict[bytes, np.ndarray]:
+        """
+        Önbellekte bulunan vektörler
+
+        Args:
+            model: Model anahtarı (model adı, backend, ölçüt)
+            keys: text_key ile hesaplanan anahtarlar
+
+        Returns:
+            Dict[bytes, np.ndarray]: anahtar -> float32 vektör (bulunanlar)
+        """
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            # SQLite parametre sınırı için parça parça sorgula
+            for start in range(0, len(unique), 500):
+                part = unique[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN "
+                    f"({', '.join('?' * len(part))})",
+                    [model, *part]
+                ).fetchall()
+                for text_hash, vector in rows:
+                    found[bytes(text_hash)] = np.frombuffer(vector, dtype='float32')
+            self.hits += len(found)
+            self.misses += len(unique) - len(found)
+        return found
+
+    def put_many(self, model: str, items: Iterable[Tuple[bytes, np.ndarray]]):
+        """Vektörleri önbelleğe yaz (aynı anahtar varsa üzerine yazılır)"""
+        rows = [(model, key, np.ascontiguousarray(vector, dtype='float32').tobytes()) for key, vector in items]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector) VALUES (?, ?, ?)", rows
+            )
+            self._conn.commit()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def clear(self, model: str = None):
+        """Önbelleği (veya sadece bir modelin kayıtlarını) sil"""
+        with self._lock:
+            if model is None:
+                self._conn.execute("DELETE FROM embeddings")
+            else:
+                self._conn.execute("DELETE FROM embeddings WHERE model = ?", (model,))
+            self._conn.commit()
+
+    def stats(self) -> Dict:
+        """İsabet / ıskalama sayaçları"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
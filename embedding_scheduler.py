@@ -0,0 +1,85 @@
+"""
+Uzunluğa Göre Gruplanmış Embedding
+Transformer bir batch'i en uzun metnin uzunluğuna göre pad eder; sabit sayıda ve
+sırası karışık parçalardan oluşan batch'lerde kısa parçalar (başlıklar) boşuna hesaplanır.
+
+Parçalar token uzunluğuna göre sıralanır, batch'ler sabit adet yerine token bütçesiyle
+(batch boyutu x en uzun parça) oluşturulur ve vektörler orijinal sıraya geri konur.
+"""
+
+import time
+from typing import Callable, List, Tuple
+
+import numpy as np
+
+
+def token_lengths(embedder, texts: List[str]) -> List[int]:
+    """
+    Metinlerin modelin tokenizer'ına göre token sayıları (modelin max_seq_length'ine kırpılır)
+    Tokenizer yoksa karakter sayısından tahmin edilir (~4 karakter / token).
+    """
+    max_length = getattr(embedder, "max_seq_length", None) or 512
+    tokenizer = getattr(embedder, "tokenizer", None)
+    if tokenizer is None:
+        return [min(max(1, len(text) // 4), max_length) for text in texts]
+    input_ids = tokenizer(texts, add_special_tokens=True, truncation=True, max_length=max_length)["input_ids"]
+    return [len(ids) for ids in input_ids]
+
+
+def plan_batches(lengths: List[int], token_budget: int, max_batch_size: int) -> List[List[int]]:
+    """
+    Parçaları uzunluğa göre sıralayıp token bütçesine sığan batch'lere böl
+
+    Args:
+        lengths: Parçaların token sayıları
+        token_budget: Batch başına en fazla pad edilmiş token (batch boyutu x en uzun parça)
+        max_batch_size: Batch başına en fazla parça
+
+    Returns:
+        List[List[int]]: Her batch için orijinal sıra numaraları
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    current = []
+    for i in order:
+        # Sıralı olduğu için batch'in en uzunu her zaman son eklenen parçadır
+        if current and ((len(current) + 1) * lengths[i] > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def embed_bucketed(embed: Callable[[List[str], int], np.ndarray], texts: List[str], lengths: List[int],
+                   token_budget: int, max_batch_size: int,
+                   on_batch: Callable[[int], None] = None) -> Tuple[np.ndarray, float]:
+    """
+    Metinleri uzunluk gruplu batch'lerle embed et, sonucu orijinal sırayla döndür
+
+    Args:
+        embed: embed(texts, batch_size) -> (n, boyut) matris
+        texts: Metinler
+        lengths: token_lengths ile hesaplanan uzunluklar
+        on_batch: Her batch'ten sonra o ana kadar encode edilen metin sayısıyla çağrılır (progress için)
+
+    Returns:
+        Tuple[np.ndarray, float]: (embedding'ler, encode süresi saniye)
+    """
+    embeddings = None
+    elapsed = 0.0
+    done = 0
+    for batch in plan_batches(lengths, token_budget, max_batch_size):
+        start = time.perf_counter()
+        vectors = embed([texts[i] for i in batch], len(batch))
+        elapsed += time.perf_counter() - start
+        if embeddings is None:
+            embeddings = np.empty((len(texts), vectors.shape[1]), dtype=vectors.dtype)
+        embeddings[batch] = vectors
+        done += len(batch)
+        if on_batch is not None:
+            on_batch(done)
+    if embeddings is None:
+        embeddings = np.empty((0, 0), dtype='float32')
+    return embeddings, elapsed
@@ -0,0 +1,156 @@
+"""
+Yakın Kopya Parça Tespiti (SimHash)
+Ders kitapları aynı metni birçok kez tekrarlar: bölüm özetleri, kutu içindeki
+tekrarlar, sayfa üst/alt bilgileri. Bu metinler embed edilmeden önce atılır;
+hem embedding/arama işi azalır hem de context aynı pasajla dolmaz.
+
+- Her metnin 64 bitlik SimHash'i BM25 terimlerinin (sparse_index.tokenize)
+  ikili kelime dizilerinden hesaplanır; küçük yazım farkları birkaç bit değiştirir
+- Hamming mesafesi max_distance'ı geçmeyen metinler kopya sayılır
+- Belge içinde iki seviyede uygulanır: aynen tekrarlanan uzun cümleler parçalama öncesi
+  bölümden çıkarılır (başka metinle aynı parçaya düşen özet kutuları), ardından
+  önceki bir parçanın yakın kopyası olan parçalar atılır
+- Arama, hash'in max_distance + 1 banda bölünmesiyle yapılır: mesafe <= max_distance
+  ise en az bir bant birebir aynıdır (güvercin yuvası), sadece o banttaki adaylar karşılaştırılır
+"""
+
+import hashlib
+import functools
+from typing import Dict, List, Set
+
+import numpy as np
+
+from sparse_index import tokenize
+
+HASH_BITS = 64
+_MASK = (1 << HASH_BITS) - 1
+
+
+@functools.lru_cache(maxsize=65536)
+def _feature_hash(feature: str) -> int:
+    """Özelliğin kararlı 64 bitlik hash'i (Python hash()'i process'e göre değişir)"""
+    return int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def simhash(text: str) -> int:
+    """
+    Metnin 64 bitlik SimHash'i
+
+    Returns:
+        int: İşaretsiz 64 bit hash (terimi olmayan metin için 0)
+    """
+    terms = tokenize(text)
+    if not terms:
+        return 0
+    features = [f"{a} {b}" for a, b in zip(terms, terms[1:])] if len(terms) > 1 else terms
+    hashes = np.fromiter((_feature_hash(feature) for feature in features), dtype=np.uint64, count=len(features))
+    # Her bit için özelliklerin oyu: bit 1 ise +1, 0 ise -1
+    bits = np.unpackbits(hashes.view(np.uint8), bitorder='little').reshape(len(features), HASH_BITS)
+    votes = bits.sum(axis=0, dtype=np.int64) * 2 - len(features)
+    packed = np.packbits(votes > 0, bitorder='little')
+    return int.from_bytes(packed.tobytes(), 'little')
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin((a ^ b) & _MASK).count('1')
+
+
+class NearDuplicateDetector:
+    def __init__(self, max_distance: int = 3):
+        """
+        Görülen metinler arasında yakın kopya tespiti
+
+        Args:
+            max_distance: Kopya sayılacak en büyük Hamming mesafesi (64 bit üzerinden)
+        """
+        self.max_distance = max_distance
+        self.band_count = max_distance + 1
+        self.band_bits = HASH_BITS // self.band_count
+        self._bands: List[Dict[int, Set[int]]] = [{} for _ in range(self.band_count)]
+        self._hashes: List[int] = []
+        self.removed = 0  # Atılan kopya sayısı
+
+    def _band_keys(self, value: int) -> List[int]:
+        mask = (1 << self.band_bits) - 1
+        return [(value >> (i * self.band_bits)) & mask for i in range(self.band_count)]
+
+    def find(self, value: int) -> int:
+        """Yakın kopyanın sıra numarası, yoksa -1"""
+        checked = set()
+        for band, key in zip(self._bands, self._band_keys(value)):
+            for i in band.get(key, ()):
+                if i in checked:
+                    continue
+                checked.add(i)
+                if hamming_distance(self._hashes[i], value) <= self.max_distance:
+                    return i
+        return -1
+
+    def add(self, value: int) -> int:
+        """Hash'i kaydet ve sıra numarasını döndür"""
+        i = len(self._hashes)
+        self._hashes.append(value)
+        for band, key in zip(self._bands, self._band_keys(value)):
+            band.setdefault(key, set()).add(i)
+        return i
+
+    def is_duplicate(self, text: str) -> bool:
+        """
+        Metin daha önce görülen bir parçanın yakın kopyası mı
+        Kopya değilse kaydedilir; kopyaysa removed sayacı artar.
+        """
+        value = simhash(text)
+        if value == 0:
+            return False
+        if self.find(value) >= 0:
+            self.removed += 1
+            return True
+        self.add(value)
+        return False
+
+
+class NearDuplicateFilter:
+    def __init__(self, max_distance: int = 3, min_sentence_terms: int = 8):
+        """
+        Bir belgenin cümle ve parça seviyesindeki kopya filtresi
+        Cümlelerde SimHash yerine terim dizisinin birebir aynı olması aranır: birkaç
+        terimlik cümlelerde tek farklı terim (ör. bir tarih) SimHash'i değiştirmeyebilir.
+
+        Args:
+            max_distance: Parçalar için kopya sayılacak en büyük Hamming mesafesi
+            min_sentence_terms: Kontrol edilecek cümlelerin en az terim sayısı
+                                (kısa cümleler doğal olarak tekrarlanabilir)
+        """
+        self.chunks = NearDuplicateDetector(max_distance)
+        self.min_sentence_terms = min_sentence_terms
+        self._sentence_keys: Set[bytes] = set()
+        self.removed_sentences = 0
+
+    @property
+    def removed_chunks(self) -> int:
+        return self.chunks.removed
+
+    def is_duplicate_sentence(self, text: str) -> bool:
+        """Uzun cümle belgede aynı terimlerle (küçük harf, kök) daha önce geçti mi"""
+        terms = tokenize(text)
+        if len(terms) < self.min_sentence_terms:
+            return False
+        key = hashlib.blake2b(" ".join(terms).encode('utf-8'), digest_size=16).digest()
+        if key in self._sentence_keys:
+            self.removed_sentences += 1
+            return True
+        self._sentence_keys.add(key)
+        return False
+
+    def is_duplicate_chunk(self, text: str) -> bool:
+        """Parça belgedeki önceki bir parçanın yakın kopyası mı"""
+        return self.chunks.is_duplicate(text)
+
+    def summary(self) -> str:
+        """Atılanların kısa özeti (hiçbir şey atılmadıysa boş)"""
+        parts = []
+        if self.removed_chunks:
+            parts.append(f"{self.removed_chunks} yakın kopya parça")
+        if self.removed_sentences:
+            parts.append(f"{self.removed_sentences} tekrarlanan cümle")
+        return f"{', '.join(parts)} atlandı" if parts else ""
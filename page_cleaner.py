@@ -0,0 +1,103 @@
+"""
+Tekrarlanan Üst / Alt Bilgi Temizliği
+PDF'lerde her sayfada tekrarlanan satırlar (kitap adı, ünite adı, yayınevi,
+sayfa numarası) sayfa metnine karışır ve parçalara, embedding'lere girer.
+
+Sayfa akışı tek geçişte temizlenir:
+- Her sayfanın ilk ve son edge_lines dolu satırı aday sayılır (konum: üst / alt)
+- Adayların normalize hali (küçük harf, tek boşluk) ve rakamları maskelenmiş hali
+  ("Sayfa 12" -> "sayfa #") sayfa başına bir kez sayılır
+- Sayfalar lookahead sayfa gecikmeyle verilir; böylece ilk sayfalardaki üst bilgiler
+  de sonraki sayfalarda tekrarlandığı görülerek temizlenir
+- Aynı konumda en az min_repeats sayfada görülen satırlar atılır; rakamı değişen
+  satırlar (sayfa numarası) sadece birkaç kelimelik etiket ise atılır
+- Başlık gibi görünen satırların ("1. ÜNİTE ...") ilk geçişi tutulur, tekrarları atılır
+"""
+
+import re
+from collections import Counter, deque
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+from token_chunker import heading_level
+
+_DIGITS = re.compile(r'\d+')
+_LETTER_WORD = re.compile(r'[^\W\d_]+')
+
+
+class PageCleaner:
+    def __init__(self, edge_lines: int = 3, min_repeats: int = 3, lookahead: int = 8,
+                 max_label_words: int = 2):
+        """
+        Sayfa üst / alt bilgisi temizleyici (her belge için yeni bir tane kullanın)
+
+        Args:
+            edge_lines: Sayfanın üstünden ve altından aday sayılan dolu satır sayısı
+            min_repeats: Bir satırın atılması için görülmesi gereken en az sayfa sayısı
+            lookahead: Karar vermeden önce bekletilen en fazla sayfa
+            max_label_words: Rakamı değişen satırların atılması için en fazla kelime sayısı
+        """
+        self.edge_lines = edge_lines
+        self.min_repeats = min_repeats
+        self.lookahead = lookahead
+        self.max_label_words = max_label_words
+        self._counts = Counter()  # (konum, normalize satır) -> görüldüğü sayfa sayısı
+        self._kept_headings = set()
+        self.removed_lines = 0
+        self.removed_chars = 0
+
+    def _candidates(self, lines: List[str]) -> Dict[int, Tuple[str, str, str]]:
+        """Sayfanın kenar satırları: satır no -> (konum, normalize, rakamları maskeli)"""
+        filled = [i for i, line in enumerate(lines) if line.strip()]
+        candidates = {}
+        for edge, indices in (("top", filled[:self.edge_lines]), ("bottom", filled[-self.edge_lines:])):
+            for i in indices:
+                if i not in candidates:
+                    normalized = " ".join(lines[i].lower().split())
+                    candidates[i] = (edge, normalized, _DIGITS.sub('#', normalized))
+        return candidates
+
+    def _is_repeated(self, line: str, edge: str, normalized: str, masked: str) -> bool:
+        if self._counts[(edge, normalized)] >= self.min_repeats:
+            return True
+        return (masked != normalized and self._counts[(edge, masked)] >= self.min_repeats
+                and len(_LETTER_WORD.findall(masked)) <= self.max_label_words)
+
+    def _clean(self, page_num: int, lines: List[str], candidates: Dict) -> Tuple[int, str]:
+        kept = []
+        for i, line in enumerate(lines):
+            if i in candidates and self._is_repeated(line, *candidates[i]):
+                edge, normalized, _ = candidates[i]
+                if heading_level(line + " ") is not None and (edge, normalized) not in self._kept_headings:
+                    # Ünite / bölüm başlığının ilk geçişi gerçek başlıktır
+                    self._kept_headings.add((edge, normalized))
+                else:
+                    self.removed_lines += 1
+                    self.removed_chars += len(line)
+                    continue
+            kept.append(line)
+        return page_num, "\n".join(kept)
+
+    def clean(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[int, str]]:
+        """
+        Sayfa akışından tekrarlanan üst / alt bilgi satırlarını at
+
+        Args:
+            pages: (sayfa no, metin) akışı
+
+        Returns:
+            Iterator[Tuple[int, str]]: Aynı sırayla temizlenmiş sayfalar
+        """
+        window = deque()
+        for page_num, text in pages:
+            lines = text.split('\n')
+            candidates = self._candidates(lines)
+            keys = set()
+            for edge, normalized, masked in candidates.values():
+                keys.add((edge, normalized))
+                keys.add((edge, masked))
+            self._counts.update(keys)
+            window.append((page_num, lines, candidates))
+            if len(window) > self.lookahead:
+                yield self._clean(*window.popleft())
+        while window:
+            yield self._clean(*window.popleft())
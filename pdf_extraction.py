@@ -0,0 +1,85 @@
+"""
+PDF Metin Çıkarma
+Sayfa metinlerini process havuzunda paralel olarak çıkarır.
+Worker process'lerde çalıştığı için sadece PyPDF2 import eder (torch/faiss yüklenmez).
+"""
+
+import os
+from collections import deque
+from typing import Iterator, List, Tuple
+
+try:
+    import PyPDF2
+except ImportError:
+    print("[WARNING] PyPDF2 eksik. Yüklemek için: pip install PyPDF2")
+
+
+def default_workers() -> int:
+    """Kullanılabilir CPU çekirdeği sayısı"""
+    return os.cpu_count() or 1
+
+
+def count_pages(pdf_path: str) -> int:
+    """PDF'teki sayfa sayısını döndür"""
+    with open(pdf_path, 'rb') as file:
+        return len(PyPDF2.PdfReader(file).pages)
+
+
+def extract_page_range(pdf_path: str, start: int, end: int) -> List[str]:
+    """
+    [start, end) aralığındaki sayfaların metnini çıkar (worker process'te çalışır)
+
+    Returns:
+        List[str]: Sayfa sırasıyla metinler
+    """
+    with open(pdf_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return [pdf_reader.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def split_page_ranges(total_pages: int, workers: int) -> List[Tuple[int, int]]:
+    """
+    Sayfaları worker'lara dağıtılacak aralıklara böl.
+    Her worker'a ~4 aralık düşer; böylece yavaş sayfalar yükü dengesizleştirmez.
+    """
+    range_size = max(1, -(-total_pages // (workers * 4)))
+    return [(start, min(start + range_size, total_pages)) for start in range(0, total_pages, range_size)]
+
+
+def iter_pages(pdf_path: str, total_pages: int, executor=None, workers: int = None) -> Iterator[Tuple[int, str]]:
+    """
+    Sayfa metinlerini sırayla üret: (sayfa_no, metin)
+
+    Executor verilirse sayfa aralıkları paralel çıkarılır, sıra korunur.
+    Aynı anda en fazla 2 * worker aralık işlenir (bellek sınırlı kalır).
+    Okuma yarıda bırakılırsa bekleyen aralıklar iptal edilir (havuz sonraki yüklemelerde de kullanılır).
+
+    Args:
+        pdf_path: PDF dosya yolu
+        total_pages: Sayfa sayısı (count_pages ile)
+        executor: concurrent.futures.ProcessPoolExecutor veya None (seri)
+        workers: Executor'daki process sayısı (verilmezse CPU çekirdeği sayısı)
+    """
+    if executor is None:
+        with open(pdf_path, 'rb') as file:
+            pdf_reader = PyPDF2.PdfReader(file)
+            for page_num in range(total_pages):
+                yield page_num, pdf_reader.pages[page_num].extract_text() or ""
+        return
+
+    workers = workers or default_workers()
+    ranges = deque(split_page_ranges(total_pages, workers))
+    in_flight = deque()
+
+    try:
+        while ranges or in_flight:
+            while ranges and len(in_flight) < workers * 2:
+                start, end = ranges.popleft()
+                in_flight.append((start, executor.submit(extract_page_range, pdf_path, start, end)))
+
+            start, future = in_flight.popleft()
+            for offset, text in enumerate(future.result()):
+                yield start + offset, text
+    finally:
+        for _, future in in_flight:
+            future.cancel()
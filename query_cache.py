@@ -0,0 +1,85 @@
+"""
+Sorgu Önbelleği
+Boyut ve süre (TTL) sınırlı, thread-safe LRU önbellek.
+RAGManager'da sorgu vektörlerini ve arama sonuçlarını saklamak için kullanılır.
+"""
+
+import re
+import time
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def normalize_query(text: str) -> str:
+    """
+    Önbellek anahtarı için sorguyu normalize et
+    - Unicode NFC (ör. "İ" harfinin birleşik ve ayrık yazılışları aynı anahtarı verir)
+    - Boşluklar tek boşluğa indirilir, baş/son boşluklar atılır
+    Büyük/küçük harf korunur: embedding modeli "cased" olduğu için
+    "Malazgirt" ve "malazgirt" farklı vektör üretir.
+    """
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 256, ttl: float = None):
+        """
+        Boyut ve süre sınırlı LRU önbellek
+
+        Args:
+            maxsize: En fazla kayıt sayısı (0 ise önbellek kapalı)
+            ttl: Kaydın geçerlilik süresi (saniye, None ise süresiz)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # anahtar -> (eklenme zamanı, değer)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Kayıt varsa ve süresi dolmadıysa döndür (en son kullanılan olarak işaretlenir)"""
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None:
+                stored_at, value = item
+                if self.ttl is None or time.monotonic() - stored_at <= self.ttl:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any):
+        """Kaydı ekle; kapasite aşılırsa en eski kullanılan kayıt atılır"""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """Tüm kayıtları sil (sayaçlar korunur)"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """İsabet / ıskalama sayaçları"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
@@ -11,8 +11,15 @@ from collections import deque
 import torch
 from transformers import AutoTokenizer, AutoModelForCausalLM
 
+try:
+    from transformers import DynamicCache
+except ImportError:
+    DynamicCache = None
+    print("[WARNING] Bu transformers sürümünde DynamicCache yok, prompt önbelleği kapalı. Güncellemek için: pip install -U transformers")
+
 from rag_manager import RAGManager
-from config import HF_TOKEN, GENERATION_CONFIG, SYSTEM_PROMPTS
+from conversation_session import ConversationSession
+from config import HF_TOKEN, GENERATION_CONFIG, SYSTEM_PROMPTS, RAG_CONFIG
 
 
 class QwenChatbot:
@@ -29,11 +36,20 @@ class QwenChatbot:
         self.top_p = GENERATION_CONFIG["top_p"]
         self.repetition_penalty = GENERATION_CONFIG["repetition_penalty"]
         
+        # Sabit talimat (system) mesajlarının KV önbelleği: prompt anahtarı -> (token id'leri, cache)
+        # load_model'den sonra bir kez hesaplanır, her soruda bir kopyası kullanılır
+        self.use_prefix_cache = DynamicCache is not None
+        self._prefix_caches = {}
+        
+        # Turlar arası KV önbelleği: önceki turların token'ları tekrar prefill edilmez
+        # Pencere 9 mesajı aşınca son 5'e (yeni mesaj dahil) düşer; başı her turda kaymaz
+        self.session = ConversationSession(max_messages=9, min_messages=5)
+        
         self.use_rag = use_rag
         self.rag_manager = None
         if use_rag:
             try:
-                self.rag_manager = RAGManager()
+                self.rag_manager = RAGManager(**RAG_CONFIG)
                 if self.rag_manager.load_database():
                     print(f"[SUCCESS] Kaydedilmiş database yüklendi: {len(self.rag_manager.chunks)} parça hazır!")
                 else:
@@ -67,6 +83,9 @@ class QwenChatbot:
             
             self.model.eval()
             
+            if self.use_prefix_cache:
+                self.build_prefix_caches()
+            
             print("[SUCCESS] Model başarıyla yüklendi!")
             print(f"[INFO] Model boyutu: ~{sum(p.numel() for p in self.model.parameters()) / 1e9:.2f}B parametreler")
             return True
@@ -75,6 +94,40 @@ class QwenChatbot:
             print(f"[ERROR] Model yükleme hatası: {str(e)}")
             return False
     
+    def build_prefix_caches(self):
+        """
+        Sabit talimat mesajlarının (rag_document, rag_general) KV önbelleğini hesapla
+        Talimatların prefill'i her soruda tekrarlanmaz; hata olursa önbellek kapatılır.
+        """
+        try:
+            for prompt_key in ("rag_document", "rag_general"):
+                prefix_ids = self.tokenizer.apply_chat_template(
+                    [{"role": "system", "content": SYSTEM_PROMPTS[prompt_key]}],
+                    add_generation_prompt=False,
+                    tokenize=True,
+                    return_tensors="pt",
+                    return_dict=True
+                )["input_ids"].to(self.model.device)
+                
+                with torch.no_grad():
+                    cache = self.model(
+                        input_ids=prefix_ids,
+                        past_key_values=DynamicCache(),
+                        use_cache=True
+                    ).past_key_values
+                
+                self._prefix_caches[prompt_key] = (prefix_ids[0].tolist(), cache)
+                print(f"[INFO] Prompt önbelleği hazır: {prompt_key} ({prefix_ids.shape[-1]} token)")
+        except Exception as e:
+            print(f"[WARNING] Prompt önbelleği oluşturulamadı, kapatılıyor: {str(e)}")
+            self.use_prefix_cache = False
+            self._prefix_caches = {}
+    
+    def reset_conversation(self):
+        """Sohbet geçmişini ve turlar arası KV önbelleğini temizle"""
+        self.chat_history.clear()
+        self.session.reset()
+    
     def load_pdfs(self, pdf_paths, progress_callback=None):
         """PDF'leri RAG sistemine yükle"""
         if not self.use_rag or not self.rag_manager:
@@ -145,52 +198,37 @@ class QwenChatbot:
             avg_similarity = 0.0
             
             if self.use_rag and self.rag_manager and self.rag_manager.index is not None:
-                rag_context = self.rag_manager.get_context_for_query(user_message, top_k=4)
+                # Context, sonuçlar ve skorlar tek aramadan gelir
+                retrieval = self.rag_manager.retrieve(user_message, top_k=4)
+                rag_context = retrieval.context
                 
                 if rag_context:
                     print("[INFO] RAG context bulundu, ekleniyor...")
-                    # Ortalama benzerlik skorunu hesapla
-                    results = self.rag_manager.search(user_message, top_k=4)
-                    if results:
-                        avg_similarity = sum(r['similarity_score'] for r in results) / len(results)
-                        print(f"[DEBUG] Ortalama benzerlik skoru: {avg_similarity:.3f}")
+                    avg_similarity = retrieval.avg_similarity
+                    print(f"[DEBUG] Ortalama benzerlik skoru: {avg_similarity:.3f}")
             
+            # Talimatlar sabit system mesajında (önbellekten gelir), soruya özgü kısım kullanıcı mesajında
             if rag_context:
-                enhanced_message = f"""Sen Türkçe tarih konularında uzman bir yapay zeka asistanısın. Sana bir TARİH KİTABI belgesi verildi.
-
-KATÎ KURALLAR:
-1. SADECE TÜRKÇE cevap ver - Hiçbir Çince (中文), İngilizce, Korece, Japonca karakteri KULLANMA
-2. Aşağıdaki BELGE bilgilerine AYNEN dayanarak cevap ver
-3. Belgede bilgi YOKSA: "Bu bilgi belgede mevcut değil" de, kesinlikle bilgi UYDURMA
-4. Etkinlik/alıştırma soruları OLMASIN - sadece bilgi odaklı cevap
-5. Cevabını EKSIKSIZ bitir, yarıda kesme
-6. Kısa ve net cevap ver (2-4 cümle yeterli)
-
-TARİH BELGESİ:
+                prompt_key = "rag_document"
+                enhanced_message = f"""TARİH BELGESİ:
 {rag_context}
 
 Kullanıcı Sorusu: {user_message}
 
 TÜRKÇE CevAP (SADECE BELGEDEN):"""
             else:
-                enhanced_message = f"""Sen Türkçe tarih konularında uzman bir yapay zeka asistanısın.
-
-KURALLAR:
-1. SADECE TÜRKÇE cevap ver
-2. Eğer belgede bu konu yoksa: "Bu konu hakkında yüklenen belgede bilgi bulamadım" de
-3. Bilgi uydurma, sadece genel tarih bilgilerini kullan
-
-Kullanıcı: {user_message}
+                prompt_key = "rag_general"
+                enhanced_message = f"""Kullanıcı: {user_message}
 
 TÜRKÇE CevAP:"""
             
-            # Geçmişe ekle
+            # Geçmişe ekle (geçmişte ham soru kalır)
             self.add_to_history("user", user_message)
             
-            # Context hazırla (son 6 mesaj)
-            messages = list(self.chat_history)[-6:]
-            # Son mesajı RAG-enhanced ile değiştir
-            messages[-1]["content"] = enhanced_message
+            # Context hazırla: talimatlar + oturum penceresi + RAG-enhanced mesaj
+            # (oturumda ham soru tutulur; eski belge context'i sonraki prompt'lara taşınmaz)
+            messages = [{"role": "system", "content": SYSTEM_PROMPTS[prompt_key]}]
+            messages += self.session.window({"role": "user", "content": enhanced_message})
             
             # Chat template
             inputs = self.tokenizer.apply_chat_template(
@@ -201,6 +239,20 @@ TÜRKÇE CevAP:"""
                 return_dict=True
             ).to(self.model.device)
             
+            cache_kwargs = {}
+            past_key_values = None
+            if self.use_prefix_cache:
+                # Önceki turun önbelleği ortak başlangıca kırpılır; talimat önbelleği daha uzun eşleşiyorsa o kullanılır
+                past_key_values = self.session.reuse(
+                    inputs["input_ids"][0].tolist(),
+                    self._prefix_caches.get(prompt_key)
+                )
+                if past_key_values is None:
+                    past_key_values = DynamicCache()
+                cache_kwargs["past_key_values"] = past_key_values
+                print(f"[DEBUG] KV önbelleği: {self.session.reused_tokens} token hazır, "
+                      f"{self.session.prefill_tokens} token prefill")
+            
             eos_token_ids = [self.tokenizer.eos_token_id]
             if hasattr(self.tokenizer, 'convert_tokens_to_ids'):
                 newline_id = self.tokenizer.convert_tokens_to_ids("\n")
@@ -217,7 +269,8 @@ TÜRKÇE CevAP:"""
                     repetition_penalty=1.2,  # 1.15'ten 1.2'ye (tekrar azaltma)
                     pad_token_id=self.tokenizer.eos_token_id,
                     eos_token_id=eos_token_ids,
-                    use_cache=True
+                    use_cache=True,
+                    **cache_kwargs
                 )
             
             # Yanıtı decode et
@@ -233,10 +286,20 @@ TÜRKÇE CevAP:"""
             
             # Geçmişe ekle
             self.add_to_history("assistant", response)
+            # Oturuma ham soru yazılır: sonraki turda önbellek bu sorunun başına kırpılır ve
+            # soru-cevap yeniden prefill edilir (daha eski mesajlar önbellekten gelir)
+            self.session.commit(
+                {"role": "user", "content": user_message},
+                {"role": "assistant", "content": response},
+                past_key_values,
+                outputs[0].tolist()
+            )
             
             return response
             
         except Exception as e:
+            # Yarım kalan üretimden sonra önbelleğin içeriği belirsiz
+            self.session.reset()
             print(f"[ERROR] Yanıt üretme hatası: {str(e)}")
             import traceback
             traceback.print_exc()
@@ -381,6 +444,8 @@ class ChatbotGUI:
         # Progress bar göster
         self.progress_bar.grid()
         self.progress_bar['value'] = 0
+        # Yükleme database'i kilitli tutar; bu sırada silme başlatılmaz
+        self.delete_pdf_button.config(state=tk.DISABLED)
         
         def load_thread():
             try:
@@ -401,6 +466,7 @@ class ChatbotGUI:
                 self.display_message("Sistem", f"Hata: {str(e)}", "system")
             finally:
                 self.progress_bar.grid_remove()
+                self.delete_pdf_button.config(state=tk.NORMAL)
         
         threading.Thread(target=load_thread, daemon=True).start()
     
@@ -469,48 +535,134 @@ class ChatbotGUI:
         
         threading.Thread(target=generate_thread, daemon=True).start()
     
+    def set_pdf_buttons_state(self, state):
+        """PDF yükleme / silme butonlarını birlikte aç veya kapat"""
+        self.pdf_button.config(state=state)
+        self.delete_pdf_button.config(state=state)
+    
     def delete_pdfs(self):
-        """Yüklü PDF'leri ve database'i sil"""
+        """Yüklü PDF'lerden seçilenleri (veya tümünü) database'den sil"""
         if not self.chatbot.use_rag or not self.chatbot.rag_manager:
             messagebox.showerror("Hata", "RAG sistemi aktif değil!")
             return
         
-        if not self.chatbot.rag_manager.chunks:
+        rag_manager = self.chatbot.rag_manager
+        
+        if not rag_manager.chunks:
             messagebox.showinfo("Bilgi", "Silinecek PDF bulunamadı!")
             return
         
-        # Onay al
-        chunk_count = len(self.chatbot.rag_manager.chunks)
-        confirm = messagebox.askyesno(
-            "PDF Silme Onayı",
-            f"Toplam {chunk_count} parça silinecek.\n"
-            "Tüm yüklü PDF'ler kalıcı olarak silinecek.\n\n"
-            "Devam etmek istiyor musunuz?"
-        )
-        
-        if not confirm:
-            return
+        documents = rag_manager.list_documents()
+        
+        # Belge seçme penceresi
+        dialog = tk.Toplevel(self.root)
+        dialog.title("PDF Sil")
+        dialog.transient(self.root)
+        dialog.grab_set()
+        
+        ttk.Label(
+            dialog,
+            text="Silmek istediğiniz PDF'leri seçin (Ctrl/Shift ile çoklu seçim):"
+        ).grid(row=0, column=0, columnspan=3, sticky=tk.W, padx=10, pady=(10, 5))
+        
+        listbox = tk.Listbox(dialog, selectmode=tk.EXTENDED, width=70, height=12, font=("Arial", 10))
+        listbox.grid(row=1, column=0, columnspan=3, sticky=(tk.W, tk.E), padx=10)
+        for doc in documents:
+            listbox.insert(tk.END, f"{doc['name']} ({doc['chunk_count']} parça)")
+        
+        def start_delete(target):
+            # Silme ve kayıt arka planda yapılır (yükleme sürerken database kilidi arayüzü dondurmasın)
+            self.set_pdf_buttons_state(tk.DISABLED)
+            self.status_label.config(text="PDF'ler siliniyor...", foreground="orange")
+            threading.Thread(target=target, daemon=True).start()
+        
+        def delete_selected():
+            selected = [documents[i] for i in listbox.curselection()]
+            if not selected:
+                messagebox.showinfo("Bilgi", "Lütfen en az bir PDF seçin.", parent=dialog)
+                return
+            
+            names = "\n".join(f"- {doc['name']}" for doc in selected)
+            confirm = messagebox.askyesno(
+                "PDF Silme Onayı",
+                f"Aşağıdaki PDF'ler kalıcı olarak silinecek:\n{names}\n\n"
+                "Devam etmek istiyor musunuz?",
+                parent=dialog
+            )
+            if not confirm:
+                return
+            
+            dialog.destroy()
+            
+            def delete_thread():
+                try:
+                    deleted = 0
+                    for doc in selected:
+                        if rag_manager.remove_document(doc["doc_hash"], save=False):
+                            deleted += 1
+                    rag_manager.save_database()
+                    
+                    self.display_message(
+                        "Sistem",
+                        f"{deleted} PDF silindi. Kalan: {len(rag_manager.documents)} PDF, "
+                        f"{len(rag_manager.chunks)} parça.",
+                        "system"
+                    )
+                    self.status_label.config(text="Seçilen PDF'ler silindi", foreground="green")
+                except Exception as e:
+                    self.display_message("Sistem", f"PDF silme hatası: {str(e)}", "system")
+                    self.status_label.config(text="Silme başarısız", foreground="red")
+                finally:
+                    self.set_pdf_buttons_state(tk.NORMAL)
+            
+            start_delete(delete_thread)
+        
+        def delete_all():
+            chunk_count = len(rag_manager.chunks)
+            confirm = messagebox.askyesno(
+                "PDF Silme Onayı",
+                f"Toplam {chunk_count} parça silinecek.\n"
+                "Tüm yüklü PDF'ler kalıcı olarak silinecek.\n\n"
+                "Devam etmek istiyor musunuz?",
+                parent=dialog
+            )
+            if not confirm:
+                return
+            
+            dialog.destroy()
+            
+            def delete_thread():
+                try:
+                    # Database'i temizle
+                    success = rag_manager.clear_database()
+                    
+                    if success:
+                        self.display_message(
+                            "Sistem",
+                            "Tüm PDF'ler başarıyla silindi!\n"
+                            "Yeni PDF'ler yükleyebilirsiniz.",
+                            "system"
+                        )
+                        self.status_label.config(text="PDF'ler silindi", foreground="green")
+                    else:
+                        self.display_message("Sistem", "PDF silme işlemi başarısız!", "system")
+                        self.status_label.config(text="Silme başarısız", foreground="red")
+                except Exception as e:
+                    self.display_message("Sistem", f"PDF silme hatası: {str(e)}", "system")
+                    self.status_label.config(text="Silme başarısız", foreground="red")
+                finally:
+                    self.set_pdf_buttons_state(tk.NORMAL)
+            
+            start_delete(delete_thread)
         
-        try:
-            # Database'i temizle
-            success = self.chatbot.rag_manager.clear_database()
-            
-            if success:
-                self.display_message(
-                    "Sistem",
-                    "Tüm PDF'ler başarıyla silindi!\n"
-                    "Yeni PDF'ler yükleyebilirsiniz.",
-                    "system"
-                )
-                self.status_label.config(text="PDF'ler silindi", foreground="green")
-            else:
-                self.display_message("Sistem", "PDF silme işlemi başarısız!", "system")
-                self.status_label.config(text="Silme başarısız", foreground="red")
-        except Exception as e:
-            messagebox.showerror("Hata", f"PDF silme hatası: {str(e)}")
-
+        ttk.Button(dialog, text="Seçilenleri Sil", command=delete_selected).grid(row=2, column=0, padx=10, pady=10)
+        ttk.Button(dialog, text="Tümünü Sil", command=delete_all).grid(row=2, column=1, pady=10)
+        ttk.Button(dialog, text="İptal", command=dialog.destroy).grid(row=2, column=2, padx=10, pady=10)
 
-if __name__ == "__main__":
+def main():
     root = tk.Tk()
     app = ChatbotGUI(root)
     root.mainloop()
+
+if __name__ == "__main__":
+    main()
@@ -4,36 +4,231 @@ PDF'lerden bilgi çıkarır, vektör database'e kaydeder ve ilgili içeriği get
 """
 
 import os
+import re
+import copy
+import json
+import time
+import queue
 import pickle
+import multiprocessing
+import shutil
+import hashlib
+import functools
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Tuple, Iterable, Iterator
 import numpy as np
 
+import pdf_extraction
+import db_generations
+import embedding_backends
+import embedding_scheduler
+import token_chunker
+from chunk_store import ChunkStore
+from embedding_cache import EmbeddingCache, text_key
+from near_duplicates import NearDuplicateFilter
+from page_cleaner import PageCleaner
+from query_cache import LRUCache, normalize_query
+from rw_lock import ReadWriteLock
+from sparse_index import SparseIndex
+from text_buffer import PageTextBuffer
+
 try:
-    import PyPDF2
-    from sentence_transformers import SentenceTransformer
+    from sentence_transformers import CrossEncoder
     import faiss
 except ImportError:
-    print("[WARNING] RAG kütüphaneleri eksik. Yüklemek için: pip install PyPDF2 sentence-transformers faiss-cpu")
+    print("[WARNING] RAG kütüphaneleri eksik. Yüklemek için: pip install sentence-transformers faiss-cpu")
+
+
+# Desteklenen FAISS index tipleri
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+# Arama modları: hybrid (FAISS + BM25, reciprocal rank fusion), dense (FAISS), sparse (BM25)
+SEARCH_MODES = ("hybrid", "dense", "sparse")
+
+# Benzerlik ölçütleri ve varsayılan context eşikleri
+#   l2: skor = 1 / (1 + L2 mesafesi), modele göre ölçeği değişir
+#   cosine: L2-normalize vektörler + inner product index, skor = kosinüs benzerliği [-1, 1]
+DEFAULT_SIMILARITY_THRESHOLDS = {"l2": 0.3, "cosine": 0.4}
+
+# Bölüm başlıkları: "1.", "1.1", "I.", "A." ve ardından büyük harf
+HEADING_PATTERN = re.compile(r'(?:^|\n)(?:\d+\.|[A-Z]\.|\d+\.\d+|[IVX]+\.)\s+[A-ZÇĞIÖŞÜ]')
+
+# Etkinlik bölümü sınırları: bundan fazla soru işareti / numaralı madde ("1) ") varsa bölüm atlanır
+MAX_ACTIVITY_QUESTIONS = 3
+MAX_ACTIVITY_NUMBERED_ITEMS = 3
+
+# Numaralı madde: "1) ", "12) "
+NUMBERED_ITEM_PATTERN = re.compile(r'\d+\)\s')
+
+
+@functools.lru_cache(maxsize=8)
+def _activity_keywords(keywords: Tuple[str, ...]) -> Tuple[str, ...]:
+    """
+    Filtre anahtar kelimelerini aramaya hazırla (küçük harf, tekrarsız)
+    Başka bir anahtar kelimeyi içeren kelimeler atılır ("soru" varken
+    "aşağıdaki soruları" ayrıca aranmaz), kısa kelimeler önce denenir.
+    """
+    unique = sorted({keyword.lower() for keyword in keywords if keyword}, key=len)
+    kept = []
+    for keyword in unique:
+        if not any(shorter in keyword for shorter in kept):
+            kept.append(keyword)
+    return tuple(kept)
+
+
+@dataclass
+class RetrievalResult:
+    """Tek bir aramanın tüm çıktısı: context metni, ham sonuçlar ve skorlar"""
+    query: str
+    context: str = ""  # Prompt'a eklenecek format edilmiş metin (eşiği geçen parçalar)
+    hits: List[Dict] = field(default_factory=list)  # Tüm arama sonuçları (skora göre sıralı)
+    used_hits: List[Dict] = field(default_factory=list)  # Context'e giren sonuçlar
+    threshold: float = 0.0
+    
+    @property
+    def scores(self) -> List[float]:
+        return [hit["similarity_score"] for hit in self.hits]
+    
+    @property
+    def reranked(self) -> bool:
+        """Sonuçlar cross-encoder ile yeniden sıralandıysa True"""
+        return bool(self.hits) and "rerank_score" in self.hits[0]
+    
+    @property
+    def avg_similarity(self) -> float:
+        """Tüm sonuçların ortalama benzerlik skoru"""
+        return sum(self.scores) / len(self.scores) if self.hits else 0.0
+
+
+def _locked(method):
+    """Metodu RAGManager._write_lock altında çalıştır (arka plandaki yeniden embed ile çakışmasın)"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class RAGManager:
-    def __init__(self, embedding_model="emrecan/bert-base-turkish-cased-mean-nli-stsb-tr"):  # Türkçe embedding modeli
+    def __init__(self, embedding_model="emrecan/bert-base-turkish-cased-mean-nli-stsb-tr",  # Türkçe embedding modeli
+                 index_type="auto", nprobe=16, ef_search=64, metric="l2", similarity_threshold=None,
+                 cache_size=256, cache_ttl=3600, search_mode="dense",
+                 reranker_model=None, rerank_candidates=50, rerank_budget_ms=300, embedding_backend="torch",
+                 embedding_cache=True):
         """
         RAG Manager - PDF'lerden bilgi çıkarma ve arama
         
         Args:
             embedding_model: Türkçe destekli sentence transformer modeli
+            index_type: "auto", "flat", "ivf_flat", "ivf_pq" veya "hnsw"
+                        ("auto": parça sayısına göre flat -> ivf_flat -> ivf_pq)
+            nprobe: IVF index'lerde sorgu başına taranan küme sayısı
+            ef_search: HNSW index'te sorgu sırasındaki aday listesi boyutu
+            metric: "l2" veya "cosine" (normalize embedding + inner product index)
+            similarity_threshold: Context'e alınacak en düşük skor
+                                  (None ise ölçüte göre varsayılan: l2 0.3, cosine 0.4)
+            cache_size: Sorgu vektörü / arama sonucu önbelleklerinin boyutu (0: kapalı)
+            cache_ttl: Önbellek kayıtlarının geçerlilik süresi (saniye, None: süresiz)
+            search_mode: "hybrid" (FAISS + BM25, reciprocal rank fusion), "dense" (sadece FAISS)
+                         veya "sparse" (sadece BM25, sorgu encode edilmez)
+            reranker_model: Cross-encoder modeli (None ise yeniden sıralama kapalı)
+            rerank_candidates: Yeniden sıralamaya alınacak aday sayısı
+            rerank_budget_ms: Yeniden sıralama süre sınırı; aşılırsa arama sırası kullanılır
+            embedding_backend: "torch" (fp32), "torch_int8" (dinamik quantize) veya "onnx" (ONNX Runtime)
+            embedding_cache: Parça vektörlerini metin özetine göre diskte sakla
+                             (aynı metinli parçalar tekrar encode edilmez)
         """
+        if index_type != "auto" and index_type not in INDEX_TYPES:
+            raise ValueError(f"Geçersiz index tipi: {index_type} (seçenekler: auto, {', '.join(INDEX_TYPES)})")
+        if metric not in DEFAULT_SIMILARITY_THRESHOLDS:
+            raise ValueError(f"Geçersiz benzerlik ölçütü: {metric} (seçenekler: l2, cosine)")
+        if embedding_backend not in embedding_backends.BACKENDS:
+            raise ValueError(f"Geçersiz embedding backend'i: {embedding_backend} "
+                             f"(seçenekler: {', '.join(embedding_backends.BACKENDS)})")
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"Geçersiz arama modu: {search_mode} (seçenekler: {', '.join(SEARCH_MODES)})")
+        
         self.embedding_model_name = embedding_model
-        self.embedder = None
+        self.embedding_backend = embedding_backend
+        self._embedders = {}  # model adı -> model (ilk sorgu / PDF yüklemede yüklenir)
+        self._embedder_backends = {}  # model adı -> gerçekte yüklenen backend (istenen kullanılamazsa "torch")
+        self.index_backend = None  # Yüklenen database'in manifest'indeki backend
+        self._embedder_lock = threading.Lock()
+        self._write_lock = threading.RLock()  # Index / chunk / dosya değişiklikleri
+        self._swap_lock = threading.Lock()  # Sorgu sırasında index ile modelin birlikte okunması
+        # Aramalar (okuma) ile index / chunk / BM25 değişiklikleri (yazma) arasında;
+        # FAISS eşzamanlı search ile add / remove'u desteklemez
+        self._index_lock = ReadWriteLock()
+        self._reembed_thread = None  # Model değişince çalışan arka plan yeniden embed işi
+        self._reembed_stop = threading.Event()
+        self._reembed_state = {}
+        self._reembed_source_dir = None
         self.index = None
-        self.chunks = []
-        self.metadata = []
+        self.index_model_name = None  # Index'teki vektörleri üreten embedding modeli
+        self._mmapped_index = None  # Diskten mmap ile açılan (salt okunur) index
+        self._index_path = None
         self.vector_db_path = "vector_db"
-        self.chunk_size = 400  # 500'den 400'e düştü (daha spesifik context)
-        self.chunk_overlap = 80  # 100'den 80'e düştü
+        self.generation_dir = None  # Yüklenen / son kaydedilen database nesli (vector_db/gen-XXXXXX)
+        self.chunk_store_path = os.path.join(self.vector_db_path, "chunks")
+        self.verify_checksums = False  # True: açılışta büyük dosyaların checksum'ı da doğrulanır
+        self.chunks = ChunkStore(self.chunk_store_path)  # vektör id'si -> chunk (FAISS id'leri ile aynı)
+        self.sparse_index = SparseIndex()  # chunk id'si -> BM25 terimleri (FAISS ile birlikte güncellenir)
+        self.metadata = []
+        self.documents = {}  # içerik hash'i -> belge bilgisi ve chunk id'leri
+        self.next_chunk_id = 0
+        self.chunk_tokens = 128  # Parça başına en fazla token (modelin max_seq_length'i ile sınırlı)
+        self.chunk_overlap_tokens = 20  # Bir önceki parçadan tekrarlanan en fazla token (tam cümleler)
+        self._chunk_tokenizer = None  # (model adı, tokenizer kopyası)
+        self.near_duplicate_distance = 3  # Belge içi yakın kopya eşiği (SimHash Hamming mesafesi, None: kapalı)
+        self.near_duplicate_min_terms = 8  # Tekrarı aranacak cümlelerin en az terim sayısı
+        self.strip_page_furniture = True  # Sayfalarda tekrarlanan üst / alt bilgi satırlarını at
+        self.page_furniture_min_pages = 3  # Bir satırın üst / alt bilgi sayılması için en az sayfa
         self.progress_callback = None
+        self.extract_workers = pdf_extraction.default_workers()  # PDF okuma için process sayısı
+        self.min_pages_for_parallel = 16  # Daha kısa PDF'ler tek process'te okunur
+        self._extract_executor = None  # PDF okuma process havuzu (ilk paralel okumada açılır, yüklemeler arasında kullanılır)
+        self._extract_executor_lock = threading.Lock()
+        self.embed_batch_size = 32  # Sorgu / karşılaştırma encode'ları için
+        self.embed_window_size = 512  # Uzunluğa göre gruplanmak üzere biriktirilen parça sayısı
+        self.embed_token_budget = 8192  # Batch başına pad edilmiş token (batch boyutu x en uzun parça)
+        self.embed_max_batch_size = 128
+        self.pipeline_queue_size = 256  # Okuma -> embedding arasında bekleyebilecek en fazla parça
+        self.max_section_chars = 50000  # Başlıksız metinde biriktirilecek en fazla karakter
+        
+        # ANN index ayarları
+        self.index_type = index_type
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.auto_ivf_threshold = 20000  # "auto": bu sayının altında tam tarama (flat)
+        self.auto_pq_threshold = 500000  # "auto": bu sayının üstünde sıkıştırılmış IVF-PQ
+        self.train_sample_size = 50000  # IVF eğitimi için kullanılacak en fazla vektör
+        
+        # Benzerlik ölçütü
+        self.metric = metric
+        self.similarity_threshold = similarity_threshold
+        
+        # Hibrit arama (dense + BM25)
+        self.search_mode = search_mode
+        self.hybrid_candidates = 20  # Her yoldan birleştirmeye alınan aday sayısı
+        self.rrf_k = 60  # Reciprocal rank fusion sabiti: skor = sum(1 / (rrf_k + sıra))
+        
+        # Cross-encoder ile yeniden sıralama (retrieve)
+        self.reranker_model_name = reranker_model
+        self.rerank_candidates = rerank_candidates
+        self.rerank_budget_ms = rerank_budget_ms
+        self._reranker = None
+        self._rerank_executor = None  # Süre sınırı için tek thread'lik havuz
+        self._rerank_future = None  # Süresi aşılıp hâlâ çalışan yeniden sıralama
+        self._rerank_pair_ms = None  # Çift başına ortalama süre (aday sayısını bütçeye sığdırmak için)
+        
+        # Tekrarlanan sorular için önbellekler
+        # Sonuç önbelleği index her değiştiğinde temizlenir (_on_index_changed)
+        self.query_cache = LRUCache(cache_size, cache_ttl)
+        self.results_cache = LRUCache(cache_size, cache_ttl)
         
         self.filter_keywords = [
             "etkinlik", "alıştırma", "soru", "cevap", "yanıt",
@@ -45,404 +240,1891 @@ class RAGManager:
         # Vector DB klasörü oluştur
         Path(self.vector_db_path).mkdir(exist_ok=True)
         
-        print("[INFO] RAG Manager başlatılıyor...")
-        self._load_embedding_model()
+        # Kalıcı embedding önbelleği (database nesillerinden bağımsız, temizlemede silinmez)
+        self.embedding_cache = None
+        if embedding_cache:
+            self.embedding_cache = EmbeddingCache(os.path.join(self.vector_db_path, "embedding_cache.sqlite"))
         
+        print("[INFO] RAG Manager başlatılıyor...")
+        # Embedding modeli burada yüklenmez; ilk sorgu veya PDF yüklemede yüklenir
         self._check_and_reset_database()
     
-    def _load_embedding_model(self):
+    @property
+    def embedder(self):
+        """
+        Index'teki vektörleri üreten embedding modeli (ilk kullanımda yüklenir)
+        Model değişikliğinden sonraki yeniden embed süresince eski model kullanılır.
+        """
+        return self._get_embedder(self.index_model_name or self.embedding_model_name)
+    
+    @embedder.setter
+    def embedder(self, value):
+        model_name = self.index_model_name or self.embedding_model_name
+        self._embedders[model_name] = value
+        self._embedder_backends.pop(model_name, None)
+    
+    def _get_embedder(self, model_name: str):
+        """Verilen modeli döndür, yüklenmemişse yükle"""
+        if model_name not in self._embedders:
+            with self._embedder_lock:
+                if model_name not in self._embedders:
+                    self._embedders[model_name] = self._load_embedding_model(model_name)
+        return self._embedders[model_name]
+    
+    def _load_embedding_model(self, model_name: str = None):
         """Embedding modelini yükle"""
+        model_name = model_name or self.embedding_model_name
         try:
-            print(f"[INFO] Embedding modeli yükleniyor: {self.embedding_model_name}")
-            self.embedder = SentenceTransformer(self.embedding_model_name)
-            print("[SUCCESS] Embedding modeli yüklendi!")
+            print(f"[INFO] Embedding modeli yükleniyor: {model_name} ({self.embedding_backend})")
+            model, backend = embedding_backends.load_encoder(model_name, self.embedding_backend)
+            self._embedder_backends[model_name] = backend
+            print(f"[SUCCESS] Embedding modeli yüklendi! ({backend})")
+            return model
         except Exception as e:
             print(f"[ERROR] Embedding modeli yükleme hatası: {str(e)}")
             raise
     
-    def load_pdf(self, pdf_path: str) -> List[str]:
+    def check_embedding_parity(self, texts: List[str] = None, sample_size: int = 64) -> Dict[str, float]:
+        """
+        Seçili backend'in (ör. torch_int8 / onnx) fp32 modele göre sapmasını ve hızını ölç
+        
+        Args:
+            texts: Örnek metinler (None ise database'den rastgele parçalar)
+            sample_size: Database'den alınacak parça sayısı
+            
+        Returns:
+            Dict: mean_cosine, min_cosine, max_drift, reference_ms, candidate_ms, speedup
+        """
+        if texts is None:
+            ids = self.chunks.ids()
+            if not len(ids):
+                raise ValueError("Karşılaştırma için database'de parça yok, texts verin")
+            rng = np.random.default_rng(0)
+            sample = rng.choice(ids, min(sample_size, len(ids)), replace=False)
+            texts = [self.chunks[int(vector_id)]["text"] for vector_id in sample]
+        
+        model_name = self.index_model_name or self.embedding_model_name
+        reference, _ = embedding_backends.load_encoder(model_name, "torch")
+        candidate = self._get_embedder(model_name)
+        report = embedding_backends.parity_check(reference, candidate, texts, batch_size=self.embed_batch_size)
+        embedding_backends.print_parity_report(self._loaded_backend(model_name), report)
+        return report
+    
+    def _loaded_backend(self, model_name: str) -> str:
+        """
+        Modelin gerçekte çalıştığı backend
+        Model bu oturumda yüklenmediyse (yeni vektör üretilmediyse) database'in kayıtlı backend'i geçerlidir.
+        """
+        if model_name in self._embedder_backends:
+            return self._embedder_backends[model_name]
+        if model_name == self.index_model_name and self.index_backend:
+            return self.index_backend
+        return self.embedding_backend
+    
+    def _embed(self, texts: List[str], batch_size: int = 32, model_name: str = None) -> np.ndarray:
+        """
+        Metinleri embedding'e çevir (float32)
+        cosine ölçütünde vektörler L2-normalize edilir; böylece inner product = kosinüs.
+        
+        Args:
+            model_name: Kullanılacak model (None ise index'in modeli)
+        """
+        embedder = self._get_embedder(model_name) if model_name else self.embedder
+        embeddings = np.ascontiguousarray(
+            embedder.encode(texts, show_progress_bar=False, batch_size=batch_size),
+            dtype='float32'
+        )
+        if self.metric == "cosine":
+            faiss.normalize_L2(embeddings)
+        return embeddings
+    
+    def _embed_chunk_texts(self, texts: List[str], model_name: str = None,
+                           on_batch=None) -> Tuple[np.ndarray, int, float, int]:
+        """
+        Parça metinlerini embed et: önce kalıcı embedding önbelleğine bakılır, kalanlar
+        token uzunluğuna göre gruplanmış batch'lerle encode edilir
+        (batch'ler sabit adet yerine embed_token_budget ile oluşturulur, sonuç orijinal sıradadır)
+        on_batch verilirse her encode batch'inden sonra hazır olan parça sayısıyla çağrılır.
+        
+        Returns:
+            Tuple: (embedding'ler, encode edilen token, encode süresi saniye, önbellekten gelen parça)
+        """
+        model_name = model_name or self.index_model_name or self.embedding_model_name
+        # Anahtar istenen değil yüklenen backend'e göre (ONNX yüklenemeyip fp32'ye düşüldüyse fp32 vektörleri)
+        self._get_embedder(model_name)
+        cache_model = f"{model_name}|{self._loaded_backend(model_name)}|{self.metric}"
+        
+        cached = {}
+        keys = []
+        if self.embedding_cache is not None:
+            keys = [text_key(text) for text in texts]
+            cached = self.embedding_cache.get_many(cache_model, keys)
+        missing = [i for i in range(len(texts)) if not cached or keys[i] not in cached]
+        
+        tokens, seconds = 0, 0.0
+        new_embeddings = None
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            lengths = embedding_scheduler.token_lengths(self._get_embedder(model_name), missing_texts)
+            new_embeddings, seconds = embedding_scheduler.embed_bucketed(
+                lambda batch, batch_size: self._embed(batch, batch_size=batch_size, model_name=model_name),
+                missing_texts, lengths, self.embed_token_budget, self.embed_max_batch_size,
+                on_batch=(lambda done: on_batch(len(texts) - len(missing) + done)) if on_batch else None
+            )
+            tokens = sum(lengths)
+            if self.embedding_cache is not None:
+                self.embedding_cache.put_many(cache_model, zip((keys[i] for i in missing), new_embeddings))
+        
+        if not cached:
+            return new_embeddings, tokens, seconds, 0
+        
+        dimension = next(iter(cached.values())).shape[0]
+        embeddings = np.empty((len(texts), dimension), dtype='float32')
+        for i, key in enumerate(keys):
+            if key in cached:
+                embeddings[i] = cached[key]
+        if missing:
+            embeddings[missing] = new_embeddings
+        return embeddings, tokens, seconds, len(texts) - len(missing)
+    
+    def _score(self, distance: float) -> float:
+        """FAISS sonucunu benzerlik skoruna çevir (yüksek = daha benzer)"""
+        if self.metric == "cosine":
+            return float(distance)  # Inner product = kosinüs benzerliği
+        return float(1 / (1 + distance))
+    
+    def _embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Sorgu vektörlerini önbellekten al; olmayanları tek bir encode çağrısında
+        index'in modeliyle encode et
+        
+        Returns:
+            np.ndarray: (sorgu sayısı, boyut) float32 matris
+        """
+        texts = [normalize_query(query) for query in queries]
+        vectors = {}
+        for text in texts:
+            if text not in vectors:
+                vectors[text] = self.query_cache.get((self.index_model_name, text))
+        
+        missing = [text for text, vector in vectors.items() if vector is None]
+        if missing:
+            embeddings = self._embed(missing, batch_size=self.embed_batch_size)
+            for text, embedding in zip(missing, embeddings):
+                vectors[text] = embedding[None, :]
+                self.query_cache.put((self.index_model_name, text), vectors[text])
+        
+        return np.vstack([vectors[text] for text in texts])
+    
+    def _on_index_changed(self):
+        """Index veya chunk'lar değişti: arama sonuçları önbelleği artık geçersiz"""
+        self.results_cache.clear()
+    
+    def cache_stats(self) -> Dict[str, Dict]:
+        """Sorgu vektörü ve arama sonucu önbelleklerinin isabet/ıskalama sayaçları"""
+        stats = {
+            "query_vectors": self.query_cache.stats(),
+            "results": self.results_cache.stats(),
+        }
+        if self.embedding_cache is not None:
+            stats["embeddings"] = self.embedding_cache.stats()
+        return stats
+    
+    def get_similarity_threshold(self) -> float:
+        """Context'e alınacak en düşük benzerlik skoru"""
+        if self.similarity_threshold is not None:
+            return self.similarity_threshold
+        return DEFAULT_SIMILARITY_THRESHOLDS[self.metric]
+    
+    @staticmethod
+    def _file_hash(pdf_path: str) -> str:
+        """
+        PDF dosyasının içerik hash'ini hesapla (SHA-256)
+        Aynı içerik farklı isimle yüklense bile aynı hash üretilir.
+        """
+        sha = hashlib.sha256()
+        with open(pdf_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                sha.update(block)
+        return sha.hexdigest()
+    
+    @staticmethod
+    def _extraction_context():
+        """
+        Worker'ların başlatma yöntemi
+        Havuz embedding sürerken üretici thread'den açılır; torch yüklü ve çok thread'li bir
+        process'i fork etmek güvenli olmadığından worker'lar, sadece pdf_extraction'ı yüklemiş
+        tek thread'li bir forkserver'dan fork edilir (olmayan platformlarda spawn).
+        Her iki yöntemde de worker'lar ana modülü yeniden import eder; uygulama bu yüzden
+        hafif bir giriş modülünden başlatılır (run_rag_chatbot.py).
+        """
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("forkserver")
+            context.set_forkserver_preload(["pdf_extraction"])
+            return context
+        return multiprocessing.get_context("spawn")
+    
+    def _extraction_pool(self, total_pages: int):
+        """
+        PDF sayfa çıkarma için process havuzu
+        Havuz ilk gerektiğinde açılır ve sonraki yüklemelerde yeniden kullanılır.
+        Az sayfa veya tek çekirdek varsa havuz kullanılmaz (process başlatma maliyetine değmez).
+        
+        Returns:
+            ProcessPoolExecutor veya None (seri okuma)
+        """
+        if self.extract_workers <= 1 or total_pages < self.min_pages_for_parallel:
+            return None
+        with self._extract_executor_lock:
+            if self._extract_executor is None:
+                self._extract_executor = ProcessPoolExecutor(max_workers=self.extract_workers,
+                                                             mp_context=self._extraction_context())
+            return self._extract_executor
+    
+    def close_extraction_pool(self):
+        """PDF okuma process'lerini kapat (sonraki paralel okumada havuz yeniden açılır)"""
+        with self._extract_executor_lock:
+            executor, self._extract_executor = self._extract_executor, None
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+    
+    def load_pdf(self, pdf_path: str, executor=None, progress_range: Tuple[float, float] = (0, 30)) -> List[str]:
         """
         PDF dosyasını yükle ve parçalara böl
         
         Args:
             pdf_path: PDF dosya yolu
+            executor: Sayfaları paralel okumak için process havuzu (None ise gerekirse açılır)
+            progress_range: Bu PDF'in okunmasına ayrılan progress aralığı (%)
             
         Returns:
             List[str]: Metin parçaları
         """
         try:
+            progress_start, progress_end = progress_range
+            
             if self.progress_callback:
-                self.progress_callback(0, f"PDF açılıyor: {Path(pdf_path).name}")
+                self.progress_callback(progress_start, f"PDF açılıyor: {Path(pdf_path).name}")
             
             print(f"[INFO] PDF yükleniyor: {pdf_path}")
             
-            with open(pdf_path, 'rb') as file:
-                pdf_reader = PyPDF2.PdfReader(file)
-                total_pages = len(pdf_reader.pages)
-                
-                full_text = ""
-                for page_num in range(total_pages):
-                    page = pdf_reader.pages[page_num]
-                    text = page.extract_text()
-                    full_text += text + "\n"
-                    
+            total_pages = pdf_extraction.count_pages(pdf_path)
+            
+            def report_pages(pages):
+                for page_num, text in pages:
                     if self.progress_callback:
-                        progress = (page_num + 1) / total_pages * 30  # 0-30% for PDF reading
+                        progress = progress_start + (page_num + 1) / total_pages * (progress_end - progress_start)
                         self.progress_callback(progress, f"Sayfa {page_num + 1}/{total_pages} okunuyor...")
-                    
-                print(f"[SUCCESS] {total_pages} sayfa okundu")
-                
-                if self.progress_callback:
-                    self.progress_callback(30, "Metin parçalanıyor...")
-                
-                # Metni parçalara böl
-                chunks = self._chunk_text(full_text, pdf_path)
-                print(f"[SUCCESS] {len(chunks)} parça oluşturuldu")
-                
-                return chunks
+                    yield page_num, text
+            
+            duplicates = self._near_duplicate_filter()
+            if executor is None:
+                executor = self._extraction_pool(total_pages)
+            pages = pdf_extraction.iter_pages(pdf_path, total_pages, executor, self.extract_workers)
+            chunks = list(self._iter_document_chunks(report_pages(pages), pdf_path, duplicates))
+            
+            removed = duplicates.summary() if duplicates is not None else ""
+            print(f"[SUCCESS] {total_pages} sayfa okundu, {len(chunks)} parça oluşturuldu"
+                  f"{f' ({removed})' if removed else ''}")
+            
+            if self.progress_callback:
+                self.progress_callback(progress_end, "Metin parçalandı")
+            
+            return chunks
                 
+        except BrokenProcessPool as e:
+            self.close_extraction_pool()
+            print(f"[ERROR] PDF okuma hatası (worker process çöktü): {str(e)}")
+            return []
         except Exception as e:
             print(f"[ERROR] PDF okuma hatası: {str(e)}")
             return []
     
-    def _chunk_text(self, text: str, source: str) -> List[Dict]:
+    def _chunk_sections(self, sections: Iterable[Dict], duplicates: NearDuplicateFilter = None) -> Iterator[Dict]:
         """
-        Metni akıllı şekilde parçalara böl
-        - Başlıklara göre böl (1., 2., I., II., gibi)
-        - Etkinlik/alıştırma parçalarını filtrele
+        Bölümleri filtrele ve parçalara böl (akış halinde)
+        - Etkinlik/alıştırma bölümleri atlanır
+        - Token bütçesini aşan bölümler cümlelere bölünüp paketlenir
+        - duplicates verilirse belgede daha önce geçen uzun cümleler çıkarılır
         """
-        chunks = []
-        text = text.strip()
-        
-        sections = self._split_by_headings(text)
-        
         for section in sections:
-            if self._is_activity_section(section):
-                print(f"[DEBUG] Etkinlik parçası filtrelendi: {section[:80]}...")
+            if not section["text"].strip():
                 continue
             
-            # Parça çok büyükse cümlelere böl
-            if len(section) <= self.chunk_size:
-                chunks.append({
-                    "text": section.strip(),
-                    "source": source,
-                    "chunk_id": len(chunks)
-                })
-            else:
-                # Büyük bölümleri cümlelere böl
-                sub_chunks = self._split_to_sentences(section)
-                chunks.extend(sub_chunks)
+            if self._is_activity_section(section["text"]):
+                print(f"[DEBUG] Etkinlik parçası filtrelendi: {section['text'][:80]}...")
+                continue
+            
+            yield from self._split_to_sentences(section, duplicates)
+    
+    def _buffer_section(self, buffer: PageTextBuffer, start: int, end: int, headings: list):
+        """
+        Tampondaki [start, end) aralığından bölüm oluştur (boşsa None)
         
-        # Chunk ID'lerini güncelle
-        for i, chunk in enumerate(chunks):
-            chunk["chunk_id"] = i
-            chunk["source"] = source
+        Returns:
+            Dict: text (strip edilmiş), pages (bölüm içi offset -> sayfa), heading (başlık yolu)
+        """
+        raw = buffer.slice(start, end)
+        text = raw.strip()
+        if not text:
+            return None
         
-        return chunks
+        lead = len(raw) - len(raw.lstrip())
+        pages = []
+        for offset, page_num in buffer.page_spans(start, end):
+            offset = max(offset - lead, 0)
+            if offset >= len(text):
+                break
+            if pages and pages[-1][0] == offset:
+                pages.pop()  # Baştaki boşlukta kalan sayfa
+            pages.append((offset, page_num + 1))
+        
+        return {"text": text, "pages": pages, "heading": token_chunker.update_heading_path(headings, text)}
+    
+    def _buffer_paragraphs(self, buffer: PageTextBuffer, headings: list) -> Iterator[Dict]:
+        """Başlıksız tamponu paragraf paragraf bölümlere ayır"""
+        text = buffer.text
+        start = 0
+        while start < len(text):
+            end = text.find('\n\n', start)
+            if end < 0:
+                end = len(text)
+            section = self._buffer_section(buffer, start, end, headings)
+            if section is not None:
+                yield section
+            start = end + 2
     
-    def _split_by_headings(self, text: str) -> List[str]:
+    def _iter_sections(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Dict]:
         """
-        Metni başlıklara göre böl
-        Örnek: "1. Malazgirt Savaşı", "2. Osmanlı Devleti"
+        Sayfa akışından bölümleri üret (tüm metni bellekte tutmadan)
+        
+        Son bölüm bir sonraki sayfada devam edebileceği için elde tutulur.
+        İlk başlıktan önceki metin (kapak, içindekiler) atlanır; hiç başlık yoksa
+        metin max_section_chars'ta bir paragraf paragraf boşaltılır. Her bölüm sayfa numaraları ve başlık yoluyla birlikte döner.
         """
-        import re
+        buffer = PageTextBuffer()
+        headings = []  # Tampondaki başlıkların offset'leri
+        heading_stack = []  # (seviye, başlık): bölümlerin başlık yolu
+        seen_heading = False
         
-        # Başlık patternleri: "1.", "1.1", "I.", "A.", vb.
-        heading_pattern = r'(?:^|\n)(?:\d+\.|[A-Z]\.|\d+\.\d+|[IVX]+\.)\s+[A-ZÇĞIÖŞÜ]'
+        for page_num, page_text in pages:
+            page_start = buffer.append(page_num, page_text)
+            # Sadece yeni sayfa taranır; sayfa başındaki "^" önceki sayfanın satır sonuna denk gelir
+            headings.extend(page_start + m.start() for m in self._find_headings(page_text + "\n"))
+            
+            if headings:
+                first = headings[0]
+                if first > 0:
+                    if seen_heading:
+                        # max_section_chars ile boşaltılmış bölümün devamı
+                        section = self._buffer_section(buffer, 0, first, heading_stack)
+                        if section is not None:
+                            yield section
+                    buffer.consume(first)
+                    headings = [h - first for h in headings]
+                seen_heading = True
+                
+                if len(headings) > 1:
+                    # Son başlığa kadar olan bölümler tamamlandı
+                    for start, end in zip(headings, headings[1:]):
+                        section = self._buffer_section(buffer, start, end, heading_stack)
+                        if section is not None:
+                            yield section
+                    buffer.consume(headings[-1])
+                    headings = [0]
+            
+            if len(buffer) > self.max_section_chars:
+                if seen_heading:
+                    section = self._buffer_section(buffer, 0, len(buffer), heading_stack)
+                    if section is not None:
+                        yield section
+                else:
+                    yield from self._buffer_paragraphs(buffer, heading_stack)
+                buffer.clear()
+                headings = []
         
-        matches = list(re.finditer(heading_pattern, text))
+        if seen_heading:
+            section = self._buffer_section(buffer, 0, len(buffer), heading_stack)
+            if section is not None:
+                yield section
+        else:
+            yield from self._buffer_paragraphs(buffer, heading_stack)
+    
+    def _near_duplicate_filter(self):
+        """Belge için yakın kopya filtresi (kapalıysa None)"""
+        if self.near_duplicate_distance is None:
+            return None
+        return NearDuplicateFilter(self.near_duplicate_distance, self.near_duplicate_min_terms)
+    
+    def _iter_document_chunks(self, pages: Iterable[Tuple[int, str]], source: str,
+                              duplicates: NearDuplicateFilter = None) -> Iterator[Dict]:
+        """
+        Sayfa akışını parçalara dönüştür: sayfalar -> (üst / alt bilgi temizliği) -> bölümler -> chunk'lar
         
-        if not matches:
-            # Başlık bulunamadıysa paragraf paragraf böl
-            return text.split('\n\n')
+        Args:
+            duplicates: Verilirse belgede daha önce görülen uzun cümlelerin ve parçaların
+                        yakın kopyaları atlanır (tekrarlanan özetler, kutu içi tekrarlar)
+        """
+        cleaner = None
+        if self.strip_page_furniture:
+            cleaner = PageCleaner(min_repeats=self.page_furniture_min_pages)
+            pages = cleaner.clean(pages)
         
-        sections = []
-        for i, match in enumerate(matches):
-            start = match.start()
-            end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
-            section = text[start:end].strip()
-            if section:
-                sections.append(section)
+        i = 0
+        for chunk in self._chunk_sections(self._iter_sections(pages), duplicates):
+            if duplicates is not None and duplicates.is_duplicate_chunk(chunk["text"]):
+                continue
+            chunk["chunk_id"] = i
+            chunk["source"] = source
+            i += 1
+            yield chunk
         
-        return sections
+        if cleaner is not None and cleaner.removed_lines:
+            print(f"[INFO] {Path(source).name}: {cleaner.removed_lines} üst / alt bilgi satırı atıldı "
+                  f"({cleaner.removed_chars} karakter)")
+    
+    @staticmethod
+    def _find_headings(text: str) -> list:
+        """Metindeki başlık eşleşmelerini bul: "1.", "1.1", "I.", "A.", vb."""
+        return list(HEADING_PATTERN.finditer(text))
     
     def _is_activity_section(self, text: str) -> bool:
         """
         Bir parçanın etkinlik/alıştırma olup olmadığını kontrol et
+        Ucuz sayım kontrolleri önce yapılır; metin bir kez küçük harfe çevrilir.
         """
-        text_lower = text.lower()
+        # Soru işareti yoğunluğu (çok fazla soru varsa etkinliktir)
+        if text.count('?') > MAX_ACTIVITY_QUESTIONS:
+            return True
+        
+        # Numaralı liste kontrolü (1) 2) 3) ... gibi); yeterince ")" yoksa regex çalıştırılmaz
+        if text.count(')') > MAX_ACTIVITY_NUMBERED_ITEMS:
+            if len(NUMBERED_ITEM_PATTERN.findall(text)) > MAX_ACTIVITY_NUMBERED_ITEMS:
+                return True
         
         # Anahtar kelime kontrolü
-        for keyword in self.filter_keywords:
+        text_lower = text.lower()
+        for keyword in _activity_keywords(tuple(self.filter_keywords)):
             if keyword in text_lower:
                 return True
         
-        # Soru işareti yoğunluğu (çok fazla soru varsa etkinliktir)
-        question_count = text.count('?')
-        if question_count > 3:  # 3'ten fazla soru işareti varsa
-            return True
-        
-        # Numaralı liste kontrolü (1) 2) 3) ... gibi)
-        numbered_list_pattern = r'\d+\)\s'
-        import re
-        if len(re.findall(numbered_list_pattern, text)) > 3:
-            return True
-        
         return False
     
-    def _split_to_sentences(self, text: str) -> List[Dict]:
+    def _get_chunk_tokenizer(self):
+        """
+        Parça boyutunu ölçmek için embedding modelinin tokenizer'ı (yoksa None)
+        Okuma thread'i encode ile aynı anda çalıştığı için tokenizer'ın bir kopyası kullanılır.
+        """
+        model_name = self.index_model_name or self.embedding_model_name
+        if self._chunk_tokenizer is None or self._chunk_tokenizer[0] != model_name:
+            tokenizer = getattr(self.embedder, "tokenizer", None)
+            self._chunk_tokenizer = (model_name, copy.deepcopy(tokenizer) if tokenizer is not None else None)
+        return self._chunk_tokenizer[1]
+    
+    def _chunk_token_budget(self) -> int:
+        """Parça başına token bütçesi (özel token'lar için modelin penceresinden pay düşülür)"""
+        max_length = getattr(self.embedder, "max_seq_length", None) or 512
+        tokenizer = self._get_chunk_tokenizer()
+        special = tokenizer.num_special_tokens_to_add() if hasattr(tokenizer, "num_special_tokens_to_add") else 2
+        return max(1, min(self.chunk_tokens, max_length - special))
+    
+    def _count_tokens(self, texts: List[str]) -> List[int]:
+        """Metinlerin token sayıları (özel token'lar hariç, kırpmasız)"""
+        if not texts:
+            return []
+        tokenizer = self._get_chunk_tokenizer()
+        if tokenizer is None:
+            return [max(1, len(text) // 4) for text in texts]
+        input_ids = tokenizer(texts, add_special_tokens=False, verbose=False)["input_ids"]
+        return [len(ids) for ids in input_ids]
+    
+    def _split_to_sentences(self, section: Dict, duplicates: NearDuplicateFilter = None) -> List[Dict]:
         """
-        Metni cümlelere böl (eski yöntem, büyük parçalar için)
+        Bölümü cümlelere ayırıp token bütçesine sığan parçalara paketle
+        Bütçeden uzun cümleler kelime sınırlarından bölünür.
         """
+        text = section["text"]
+        budget = self._chunk_token_budget()
+        
+        spans = token_chunker.split_sentences(text)
+        sentence_count = len(spans)
+        if duplicates is not None:
+            spans = [(start, end) for start, end in spans
+                     if not duplicates.is_duplicate_sentence(text[start:end])]
+        contiguous = len(spans) == sentence_count  # Cümle atıldıysa parça metni kalan cümlelerden kurulur
+        lengths = self._count_tokens([text[start:end] for start, end in spans])
+        
+        if sum(lengths) > budget and any(length > budget for length in lengths):
+            split_spans = []
+            split_lengths = []
+            for span, length in zip(spans, lengths):
+                if length <= budget:
+                    split_spans.append(span)
+                    split_lengths.append(length)
+                    continue
+                words = token_chunker.split_words(text, *span)
+                word_lengths = self._count_tokens([text[start:end] for start, end in words])
+                for first, last in token_chunker.pack_spans(word_lengths, budget, 0):
+                    split_spans.append((words[first][0], words[last - 1][1]))
+                    split_lengths.append(sum(word_lengths[first:last]))
+            spans, lengths = split_spans, split_lengths
+        
+        if sum(lengths) <= budget:
+            groups = [(0, len(spans))] if spans else []
+        else:
+            groups = token_chunker.pack_spans(lengths, budget, self.chunk_overlap_tokens)
+        
         chunks = []
-        sentences = text.replace('\n', ' ').split('. ')
-        
-        current_chunk = ""
-        for sentence in sentences:
-            if len(current_chunk) + len(sentence) > self.chunk_size:
-                if current_chunk:
-                    chunks.append({
-                        "text": current_chunk.strip(),
-                        "source": "",  # Sonra doldurulacak
-                        "chunk_id": len(chunks)
-                    })
-                    
-                    overlap_text = current_chunk[-self.chunk_overlap:]
-                    current_chunk = overlap_text + " " + sentence
-                else:
-                    current_chunk = sentence
+        for i, (first, last) in enumerate(groups):
+            start, end = spans[first][0], spans[last - 1][1]
+            page_start, page_end = token_chunker.page_range(section["pages"], start, end)
+            if not contiguous:
+                chunk_text = " ".join(text[a:b] for a, b in spans[first:last]).replace('\n', ' ')
+            elif len(groups) == 1:
+                chunk_text = text[start:end]
             else:
-                current_chunk += ". " + sentence if current_chunk else sentence
-        
-        if current_chunk:
+                chunk_text = text[start:end].replace('\n', ' ')
             chunks.append({
-                "text": current_chunk.strip(),
-                "source": "",
-                "chunk_id": len(chunks)
+                "text": chunk_text,
+                "source": "",  # Sonra doldurulacak
+                "chunk_id": i,
+                "page_start": page_start,
+                "page_end": page_end,
+                "heading": section["heading"],
             })
-        
         return chunks
     
-    def add_documents(self, pdf_paths: List[str]):
+    @_locked
+    def add_documents(self, pdf_paths: List[str], incremental: bool = True, save: bool = True):
         """
         PDF'leri yükle ve vektör database'e ekle
         
         Args:
             pdf_paths: PDF dosya yolları listesi
+            incremental: True ise mevcut database'e eklenir, daha önce yüklenmiş
+                         (aynı içerik hash'ine sahip) PDF'ler atlanır.
+                         False ise database sıfırdan oluşturulur.
+            save: True ise database yükleme sonunda diske yazılır
         """
-        all_chunks = []
+        if not incremental:
+            with self._index_lock.write():
+                self.index = None
+                self.chunks = ChunkStore(self.chunk_store_path)
+                self.sparse_index = SparseIndex()
+                self.documents = {}
+                self.next_chunk_id = 0
         
-        total_pdfs = len(pdf_paths)
+        new_documents = {}
         
-        # Tüm PDF'leri yükle
-        for idx, pdf_path in enumerate(pdf_paths, 1):
-            if self.progress_callback:
-                self.progress_callback(
-                    30 * (idx - 1) / total_pdfs, 
-                    f"PDF {idx}/{total_pdfs} işleniyor..."
-                )
+        # Yeni PDF'leri belirle (içerik hash'i ile) ve sayfa sayılarını al
+        pending = []
+        for pdf_path in pdf_paths:
+            try:
+                doc_hash = self._file_hash(pdf_path)
+                total_pages = pdf_extraction.count_pages(pdf_path)
+            except Exception as e:
+                print(f"[ERROR] PDF okunamadı: {pdf_path} ({str(e)})")
+                continue
+            
+            if doc_hash in self.documents or any(doc_hash == p[1] for p in pending):
+                print(f"[INFO] PDF zaten yüklü, atlanıyor: {Path(pdf_path).name}")
+                continue
             
-            chunks = self.load_pdf(pdf_path)
-            all_chunks.extend(chunks)
+            pending.append((pdf_path, doc_hash, total_pages))
         
-        if not all_chunks:
-            print("[WARNING] Hiç metin parçası bulunamadı!")
+        if not pending:
+            print("[INFO] Yeni PDF yok, database güncel.")
+            if self.progress_callback:
+                self.progress_callback(100, "Tamamlandı!")
             return
         
-        if self.progress_callback:
-            self.progress_callback(40, f"Embedding'ler oluşturuluyor... ({len(all_chunks)} parça)")
+        total_pdfs = len(pending)
+        all_pages = sum(p[2] for p in pending)
+        state = {"pages_read": 0, "current_pdf": 0, "received": 0}  # received: kuyruktan alınan parça
+        
+        # Okuma -> parçalama aşaması ayrı thread'de çalışır; embedding ile örtüşür.
+        # Aradaki kuyruk sınırlı olduğu için okuma embedding'in çok önüne geçemez.
+        chunk_queue = queue.Queue(maxsize=self.pipeline_queue_size)
+        stop_event = threading.Event()
         
-        print(f"[INFO] Toplam {len(all_chunks)} parça işleniyor...")
+        def put(item):
+            while not stop_event.is_set():
+                try:
+                    chunk_queue.put(item, timeout=0.5)
+                    return
+                except queue.Full:
+                    continue
+        
+        def count_pages_read(pages):
+            for page_num, text in pages:
+                state["pages_read"] += 1
+                yield page_num, text
+        
+        def produce():
+            try:
+                executor = self._extraction_pool(all_pages)
+                for idx, (pdf_path, doc_hash, total_pages) in enumerate(pending, 1):
+                    if stop_event.is_set():
+                        return
+                    state["current_pdf"] = idx
+                    print(f"[INFO] PDF yükleniyor: {pdf_path}")
+                    
+                    pages = pdf_extraction.iter_pages(pdf_path, total_pages, executor, self.extract_workers)
+                    duplicates = self._near_duplicate_filter()
+                    for chunk in self._iter_document_chunks(count_pages_read(pages), pdf_path, duplicates):
+                        chunk["doc_hash"] = doc_hash
+                        put(("chunk", chunk))
+                    put(("doc_end", (pdf_path, doc_hash, duplicates)))
+            except BrokenProcessPool as e:
+                # Çöken worker havuzu kullanılamaz; sonraki yükleme yenisini açar
+                self.close_extraction_pool()
+                put(("error", e))
+            except Exception as e:
+                put(("error", e))
+            finally:
+                put(("done", None))
         
-        # Chunk'ları kaydet
-        self.chunks = all_chunks
+        producer = threading.Thread(target=produce, daemon=True)
         
-        # Embedding'leri oluştur
-        texts = [chunk["text"] for chunk in all_chunks]
         print("[INFO] Embedding'ler oluşturuluyor... (Bu birkaç dakika sürebilir)")
+        if self.progress_callback:
+            self.progress_callback(0, f"PDF 1/{total_pdfs} işleniyor...")
+        
+        batch = []  # (vektör id'si, chunk)
+        doc_ids = {}  # belge hash'i -> bu çağrıda eklenen chunk id'leri
+        added = 0
+        duplicate_counts = {"chunks": 0, "sentences": 0}  # Embed edilmeden atılan yakın kopyalar
+        embed_stats = {"tokens": 0, "seconds": 0.0, "cached": 0}
         
-        embeddings_list = []
-        batch_size = 32
-        total_batches = (len(texts) + batch_size - 1) // batch_size
+        def throughput() -> str:
+            seconds = max(embed_stats["seconds"], 1e-9)
+            encoded = added - embed_stats["cached"]
+            return (f"{embed_stats['cached']} önbellekten, {encoded / seconds:.1f} parça/s, "
+                    f"{embed_stats['tokens'] / seconds:.0f} token/s")
+        
+        def report_progress(embedded: int):
+            if not self.progress_callback:
+                return
+            # Okunan sayfa oranı x okunan parçalardan embed edilenlerin oranı (0-90%);
+            # okuma embedding'in önüne geçtiğinde de bar batch batch ilerler
+            progress = 90 * state["pages_read"] / all_pages * embedded / max(state["received"], 1)
+            # Hız ilk pencere tamamlanınca bilinir
+            speed = f" ({throughput()})" if embed_stats["seconds"] else ""
+            self.progress_callback(
+                progress,
+                f"PDF {state['current_pdf']}/{total_pdfs}: "
+                f"{state['pages_read']}/{all_pages} sayfa okundu, {embedded} parça embed edildi{speed}"
+            )
         
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
-            batch_embeddings = self.embedder.encode(
-                batch,
-                show_progress_bar=False,
-                batch_size=batch_size
+        def flush_batch():
+            nonlocal added
+            embeddings, tokens, seconds, cached = self._embed_chunk_texts(
+                [chunk["text"] for _, chunk in batch],
+                on_batch=lambda done: report_progress(added + done)
             )
-            embeddings_list.append(batch_embeddings)
+            embed_stats["tokens"] += tokens
+            embed_stats["seconds"] += seconds
+            embed_stats["cached"] += cached
             
-            if self.progress_callback:
-                current_batch = (i // batch_size) + 1
-                progress = 40 + (current_batch / total_batches * 50)  # 40-90%
-                self.progress_callback(
-                    progress, 
-                    f"Embedding: {current_batch}/{total_batches} batch"
-                )
+            # FAISS index oluştur (yoksa) ve yeni vektörleri kendi id'leriyle ekle
+            # (ANN tipi eğitim verisi gerektirdiği için yükleme sonunda kurulur)
+            # Embedding kilit dışında yapılır; aramalar sadece ekleme sırasında bekler
+            with self._index_lock.write():
+                if self.index is None:
+                    self.index = self._create_index(embeddings.shape[1], "flat")
+                    self.index_model_name = self.embedding_model_name
+                self._ensure_writable_index()
+                ids = np.array([vector_id for vector_id, _ in batch], dtype='int64')
+                self.index.add_with_ids(embeddings, ids)
+                
+                for vector_id, chunk in batch:
+                    self.chunks[vector_id] = chunk
+                    self.sparse_index.add(vector_id, chunk["text"])
+            added += len(batch)
+            batch.clear()
+            report_progress(added)
+        
+        producer.start()
+        try:
+            while True:
+                kind, payload = chunk_queue.get()
+                
+                if kind == "chunk":
+                    state["received"] += 1
+                    vector_id = self.next_chunk_id
+                    self.next_chunk_id += 1
+                    doc_ids.setdefault(payload["doc_hash"], []).append(vector_id)
+                    batch.append((vector_id, payload))
+                    if len(batch) >= self.embed_window_size:
+                        flush_batch()
+                
+                elif kind == "doc_end":
+                    pdf_path, doc_hash, duplicates = payload
+                    chunk_ids = doc_ids.get(doc_hash, [])
+                    removed = ""
+                    if duplicates is not None:
+                        duplicate_counts["chunks"] += duplicates.removed_chunks
+                        duplicate_counts["sentences"] += duplicates.removed_sentences
+                        removed = duplicates.summary()
+                    print(f"[SUCCESS] {Path(pdf_path).name}: {len(chunk_ids)} parça oluşturuldu"
+                          f"{f' ({removed})' if removed else ''}")
+                    if chunk_ids:
+                        new_documents[doc_hash] = {
+                            "source": pdf_path,
+                            "name": Path(pdf_path).name,
+                            "chunk_count": len(chunk_ids),
+                            "chunk_ids": chunk_ids
+                        }
+                    else:
+                        print(f"[WARNING] Metin parçası bulunamadı: {Path(pdf_path).name}")
+                
+                elif kind == "error":
+                    raise payload
+                
+                else:
+                    break
+            
+            if batch:
+                flush_batch()
+        except BaseException:
+            # Yarım kalan yüklemeyi geri al: bu çağrıda eklenen vektörleri sil
+            stop_event.set()
+            added_ids = [vector_id for ids in doc_ids.values() for vector_id in ids]
+            with self._index_lock.write():
+                for vector_id in added_ids:
+                    chunk = self.chunks.pop(vector_id, None)
+                    if chunk is not None:
+                        self.sparse_index.remove(vector_id, chunk["text"])
+            if added_ids and self.index is not None:
+                self._remove_vectors(added_ids)
+            self._on_index_changed()
+            raise
+        finally:
+            producer.join()
         
-        embeddings = np.vstack(embeddings_list)
+        self._on_index_changed()
         
-        if self.progress_callback:
-            self.progress_callback(90, "FAISS index oluşturuluyor...")
+        if not added:
+            print("[WARNING] Hiç metin parçası bulunamadı!")
+            if self.progress_callback:
+                self.progress_callback(100, "Tamamlandı!")
+            return
+        
+        self.documents.update(new_documents)
         
-        # FAISS index oluştur
-        dimension = embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dimension)
-        self.index.add(embeddings.astype('float32'))
+        print(f"[SUCCESS] {added} parça vektör database'e eklendi! (Toplam: {len(self.chunks)}, {throughput()})")
+        if duplicate_counts["chunks"] or duplicate_counts["sentences"]:
+            print(f"[INFO] Embed edilmeden atlanan yakın kopyalar: {duplicate_counts['chunks']} parça, "
+                  f"{duplicate_counts['sentences']} cümle")
         
-        print(f"[SUCCESS] {len(all_chunks)} parça vektör database'e eklendi!")
+        if self.progress_callback:
+            self.progress_callback(90, "FAISS index kontrol ediliyor...")
+        self._maybe_rebuild_index()
         
         if self.progress_callback:
             self.progress_callback(95, "Database kaydediliyor...")
         
         # Database'i kaydet
-        self.save_database()
+        if save:
+            self.save_database()
         
         if self.progress_callback:
             self.progress_callback(100, "Tamamlandı!")
     
-    def search(self, query: str, top_k: int = 4) -> List[Dict]:  # top_k 3'ten 4'e çıktı
+    def _choose_index_type(self, n_vectors: int) -> str:
+        """Ayarlara ve vektör sayısına göre kullanılacak index tipini seç"""
+        if self.index_type != "auto":
+            return self.index_type
+        if n_vectors < self.auto_ivf_threshold:
+            return "flat"
+        if n_vectors < self.auto_pq_threshold:
+            return "ivf_flat"
+        return "ivf_pq"
+    
+    @staticmethod
+    def _ivf_nlist(n_vectors: int) -> int:
+        """IVF küme sayısı: ~4*sqrt(n), küme başına en az 39 eğitim vektörü kalacak şekilde"""
+        return max(1, min(int(4 * np.sqrt(n_vectors)), n_vectors // 39))
+    
+    @staticmethod
+    def _trainable_index_type(index_type: str, n_train: int) -> str:
+        """Eğitim verisi yetmiyorsa IVF tipinin düşeceği alt tip (ivf_pq -> ivf_flat -> flat)"""
+        if index_type == "ivf_pq" and n_train < 256 * 39:
+            index_type = "ivf_flat"
+        if index_type == "ivf_flat" and n_train < 2 * 39:
+            index_type = "flat"
+        return index_type
+    
+    @staticmethod
+    def _index_kind(index) -> str:
+        """Mevcut FAISS index'in tipini bul"""
+        if index is None:
+            return None
+        inner = faiss.downcast_index(index.index) if hasattr(index, "id_map") else index
+        if isinstance(inner, faiss.IndexHNSW):
+            return "hnsw"
+        if isinstance(inner, faiss.IndexIVFPQ):
+            return "ivf_pq"
+        if isinstance(inner, faiss.IndexIVF):
+            return "ivf_flat"
+        return "flat"
+    
+    def _create_index(self, dimension: int, index_type: str = "flat", training_vectors: np.ndarray = None):
         """
-        Sorguya en yakın parçaları bul
+        Boş, id eşlemeli FAISS index oluştur.
+        Her vektör chunk id'si ile saklanır; tek bir belgenin vektörleri
+        diğerlerine dokunmadan silinebilir.
+        
+        - flat: IndexIDMap2(IndexFlatL2 / IndexFlatIP), tam tarama (kesin sonuç)
+        - hnsw: IndexIDMap2(IndexHNSWFlat), graf tabanlı, eğitim gerekmez
+        - ivf_flat / ivf_pq: IVF id'leri kendisi saklar, training_vectors ile eğitilir
+        
+        Yeterli eğitim verisi yoksa IVF yerine bir alt tipe düşülür.
+        cosine ölçütünde tüm tipler inner product ile kurulur.
+        """
+        faiss_metric = faiss.METRIC_INNER_PRODUCT if self.metric == "cosine" else faiss.METRIC_L2
+
+        n_train = 0 if training_vectors is None else len(training_vectors)
+        
+        trainable = self._trainable_index_type(index_type, n_train)
+        if trainable != index_type:
+            print(f"[WARNING] {index_type} için eğitim verisi yetersiz ({n_train}), {trainable} index kullanılıyor")
+            index_type = trainable
+        
+        if index_type == "flat":
+            if self.metric == "cosine":
+                return faiss.IndexIDMap2(faiss.IndexFlatIP(dimension))
+            return faiss.IndexIDMap2(faiss.IndexFlatL2(dimension))
+        
+        if index_type == "hnsw":
+            return faiss.IndexIDMap2(faiss.IndexHNSWFlat(dimension, 32, faiss_metric))
+        
+        nlist = self._ivf_nlist(n_train)
+        # Normalize vektörlerde L2 ve kosinüs aynı kümeleri verir; quantizer L2 kalabilir
+        quantizer = faiss.IndexFlatL2(dimension)
+        if index_type == "ivf_pq":
+            # Alt vektör sayısı boyutu tam bölmeli (768 -> 64 alt vektör, her biri 12 boyut)
+            m = next(m for m in (64, 48, 32, 24, 16, 12, 8, 4, 2, 1) if dimension % m == 0)
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, m, 8, faiss_metric)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss_metric)
+        
+        print(f"[INFO] {index_type} index eğitiliyor ({n_train} vektör, {nlist} küme)...")
+        index.train(np.ascontiguousarray(training_vectors, dtype='float32'))
+        # id -> konum tablosu: reconstruct() ve remove_ids() için gerekli
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+        return index
+    
+    def _apply_search_params(self, index=None):
+        """Sorgu zamanı ANN parametrelerini (nprobe / efSearch) index'e uygula"""
+        index = self.index if index is None else index
+        kind = self._index_kind(index)
+        if kind in ("ivf_flat", "ivf_pq"):
+            index.nprobe = self.nprobe
+        elif kind == "hnsw":
+            faiss.downcast_index(index.index).hnsw.efSearch = self.ef_search
+    
+    def _reconstruct_vectors(self, ids) -> np.ndarray:
+        """Verilen chunk id'lerinin vektörlerini index'ten geri oku"""
+        if not len(ids):
+            return np.zeros((0, self.index.d), dtype='float32')
+        return np.vstack([self.index.reconstruct(int(vector_id)) for vector_id in ids]).astype('float32')
+    
+    def _rebuild_index(self, index_type: str):
+        """
+        Index'i istenen tipte yeniden kur (vektörler mevcut index'ten okunur,
+        yeniden embed gerekmez). IVF tipleri rastgele bir örnek üzerinde eğitilir.
+        Ölçüt cosine ise vektörler normalize edilir (L2 index'ten geçiş için).
+        """
+        ids = self.chunks.ids()
+        vectors = self._reconstruct_vectors(ids)
+        if self.metric == "cosine":
+            faiss.normalize_L2(vectors)
+        
+        sample = vectors
+        if len(vectors) > self.train_sample_size:
+            rng = np.random.default_rng(0)
+            sample = vectors[rng.choice(len(vectors), self.train_sample_size, replace=False)]
+        
+        new_index = self._create_index(self.index.d, index_type, training_vectors=sample)
+        if len(ids):
+            new_index.add_with_ids(vectors, ids)
+        
+        print(f"[SUCCESS] Index yeniden kuruldu: {self._index_kind(self.index)} -> {self._index_kind(new_index)} ({len(ids)} vektör)")
+        # Yeni index kilit dışında kurulur, sadece devreye alınması aramaları bekletir
+        with self._index_lock.write():
+            self.index = new_index
+        self._on_index_changed()
+    
+    def _maybe_rebuild_index(self):
+        """
+        Parça sayısı değiştiğinde index tipini gözden geçir.
+        İstenen tip farklıysa veya IVF küme sayısı veriye göre çok küçük kaldıysa yeniden kur.
+        """
+        if self.index is None:
+            return
+        
+        n_vectors = self.index.ntotal
+        # _create_index'in eğitim verisine göre düşeceği tip (aksi halde her yüklemede aynı tip yeniden kurulur)
+        desired = self._trainable_index_type(self._choose_index_type(n_vectors),
+                                             min(n_vectors, self.train_sample_size))
+        current = self._index_kind(self.index)
+        
+        outgrown = current in ("ivf_flat", "ivf_pq") and self._ivf_nlist(n_vectors) > 2 * self.index.nlist
+        
+        if desired != current or outgrown:
+            self._rebuild_index(desired)
+    
+    def _remove_vectors(self, ids):
+        """
+        Verilen chunk id'lerinin vektörlerini index'ten sil.
+        HNSW silmeyi desteklemediği için kalan vektörlerle yeniden kurulur
+        (o sırada silinen id'ler chunk store'da olmadığı için arama sonuçlarından elenir).
+        """
+        if self._index_kind(self.index) == "hnsw":
+            self._rebuild_index("hnsw")
+        else:
+            with self._index_lock.write():
+                self._ensure_writable_index()
+                self.index.remove_ids(np.array(ids, dtype='int64'))
+    
+    def evaluate_index(self, queries: List[str] = None, top_k: int = 10, num_queries: int = 200,
+                       index_types: List[str] = None) -> List[Dict]:
+        """
+        ANN index'lerin tam taramaya (flat) göre recall ve gecikme raporu
         
         Args:
-            query: Kullanıcı sorusu
-            top_k: Kaç parça döndürülecek
+            queries: Test sorguları (verilmezse database'deki vektörlerden örneklenir)
+            top_k: recall@k için k
+            num_queries: Örneklenecek sorgu sayısı (queries verilmezse)
+            index_types: Karşılaştırılacak tipler (verilmezse sadece mevcut index)
             
         Returns:
-            List[Dict]: En benzer parçalar
+            List[Dict]: Her (index tipi, parametre) için recall ve sorgu başına gecikme (ms)
         """
         if self.index is None or not self.chunks:
             print("[WARNING] Vektör database boş!")
             return []
         
-        # Sorgu embedding'i
-        query_embedding = self.embedder.encode([query])
+        ids = self.chunks.ids()
+        vectors = self._reconstruct_vectors(ids)
         
-        # En yakın parçaları bul
-        distances, indices = self.index.search(query_embedding.astype('float32'), top_k)
+        if queries:
+            query_vectors = self._embed(queries)
+        else:
+            rng = np.random.default_rng(0)
+            query_vectors = vectors[rng.choice(len(vectors), min(num_queries, len(vectors)), replace=False)]
+        top_k = min(top_k, len(ids))
         
-        results = []
-        for idx, distance in zip(indices[0], distances[0]):
-            if idx < len(self.chunks):
-                result = self.chunks[idx].copy()
-                result["similarity_score"] = float(1 / (1 + distance))  # Similarity score
-                results.append(result)
+        def run(index):
+            start = time.perf_counter()
+            found = [index.search(query_vectors[i:i + 1], top_k)[1][0] for i in range(len(query_vectors))]
+            latency_ms = (time.perf_counter() - start) * 1000 / len(query_vectors)
+            return found, latency_ms
+        
+        # Referans: tam tarama
+        baseline = self._create_index(self.index.d, "flat")
+        baseline.add_with_ids(vectors, ids)
+        truth, baseline_ms = run(baseline)
+        truth_sets = [set(t.tolist()) for t in truth]
+        
+        report = [{"index": "flat", "param": "-", "recall": 1.0, "latency_ms": baseline_ms}]
+        
+        candidates = [("current", self.index)]
+        for index_type in index_types or []:
+            if index_type == "flat":
+                continue
+            sample = vectors[:self.train_sample_size]
+            candidate = self._create_index(self.index.d, index_type, training_vectors=sample)
+            candidate.add_with_ids(vectors, ids)
+            candidates.append((index_type, candidate))
+        
+        saved_params = (self.nprobe, self.ef_search)
+        try:
+            for _, index in candidates:
+                kind = self._index_kind(index)
+                if kind in ("ivf_flat", "ivf_pq"):
+                    sweep = [("nprobe", v) for v in (1, 4, 16, 64) if v <= index.nlist]
+                elif kind == "hnsw":
+                    sweep = [("efSearch", v) for v in (16, 32, 64, 128)]
+                else:
+                    sweep = [("-", None)]
+                
+                for param, value in sweep:
+                    if param == "nprobe":
+                        self.nprobe = value
+                    elif param == "efSearch":
+                        self.ef_search = value
+                    self._apply_search_params(index)
+                    
+                    found, latency_ms = run(index)
+                    recall = np.mean([
+                        len(truth_set & set(f.tolist())) / max(len(truth_set), 1)
+                        for truth_set, f in zip(truth_sets, found)
+                    ])
+                    report.append({
+                        "index": kind,
+                        "param": f"{param}={value}" if value is not None else "-",
+                        "recall": float(recall),
+                        "latency_ms": latency_ms
+                    })
+        finally:
+            self.nprobe, self.ef_search = saved_params
+            self._apply_search_params()
+        
+        print(f"[INFO] Recall@{top_k} / gecikme raporu ({len(query_vectors)} sorgu, {len(ids)} vektör):")
+        print(f"  {'Index':<10}{'Parametre':<14}{'Recall':>8}{'ms/sorgu':>10}")
+        for row in report:
+            print(f"  {row['index']:<10}{row['param']:<14}{row['recall']:>8.3f}{row['latency_ms']:>10.3f}")
+        
+        return report
+    
+    def _resolve_document(self, path_or_hash: str):
+        """
+        Belge anahtarını (içerik hash'i, dosya yolu veya dosya adı) hash'e çevir
+        
+        Returns:
+            str: Belgenin hash'i, bulunamazsa None
+        """
+        if path_or_hash in self.documents:
+            return path_or_hash
+        
+        target = os.path.abspath(path_or_hash)
+        for doc_hash, info in self.documents.items():
+            if os.path.abspath(info["source"]) == target:
+                return doc_hash
+        
+        for doc_hash, info in self.documents.items():
+            if info["name"] == path_or_hash:
+                return doc_hash
+        
+        return None
+    
+    def list_documents(self) -> List[Dict]:
+        """
+        Yüklü belgeleri listele
+        
+        Returns:
+            List[Dict]: Her belge için hash, ad, kaynak yol ve parça sayısı
+        """
+        return [
+            {
+                "doc_hash": doc_hash,
+                "name": info["name"],
+                "source": info["source"],
+                "chunk_count": len(info.get("chunk_ids", []))
+            }
+            for doc_hash, info in self.documents.items()
+        ]
+    
+    @_locked
+    def remove_document(self, path_or_hash: str, save: bool = True) -> bool:
+        """
+        Tek bir PDF'i database'den sil (diğer belgeler yeniden embed edilmez)
+        
+        Args:
+            path_or_hash: Belgenin içerik hash'i, dosya yolu veya dosya adı
+            save: True ise değişiklik hemen diske yazılır
+            
+        Returns:
+            bool: Belge bulunup silindiyse True
+        """
+        doc_hash = self._resolve_document(path_or_hash)
+        if doc_hash is None:
+            print(f"[WARNING] Belge bulunamadı: {path_or_hash}")
+            return False
+        
+        info = self.documents.pop(doc_hash)
+        chunk_ids = info.get("chunk_ids", [])
         
-        results.sort(key=lambda x: x['similarity_score'], reverse=True)
+        with self._index_lock.write():
+            for vector_id in chunk_ids:
+                chunk = self.chunks.pop(vector_id, None)
+                if chunk is not None:
+                    self.sparse_index.remove(vector_id, chunk["text"])
+        if chunk_ids and self.index is not None:
+            self._remove_vectors(chunk_ids)
+        self._on_index_changed()
         
-        print(f"[DEBUG] RAG arama sonuçları (top {top_k}):")
+        print(f"[SUCCESS] Belge silindi: {info['name']} ({len(chunk_ids)} parça)")
+        
+        if save:
+            self.save_database()
+        return True
+    
+    @_locked
+    def replace_document(self, pdf_path: str, old_path_or_hash: str = None) -> bool:
+        """
+        Bir PDF'i yeni sürümüyle değiştir
+        Sadece bu belgenin parçaları silinip yeniden embed edilir.
+        
+        Args:
+            pdf_path: Yeni PDF dosya yolu
+            old_path_or_hash: Değiştirilecek belge (verilmezse pdf_path ile aynı kaynak)
+            
+        Returns:
+            bool: Yeni sürüm eklendiyse (veya belge değişmediyse) True; aksi halde eski belge korunur
+        """
+        old_hash = self._resolve_document(old_path_or_hash or pdf_path)
+        
+        # Yeni PDF önce kontrol edilir; eski belge ancak yenisi eklendikten sonra silinir
+        try:
+            new_hash = self._file_hash(pdf_path)
+            total_pages = pdf_extraction.count_pages(pdf_path)
+        except Exception as e:
+            print(f"[ERROR] PDF okunamadı, belge değiştirilmedi: {pdf_path} ({str(e)})")
+            return False
+        
+        if old_hash is not None and old_hash == new_hash:
+            print(f"[INFO] Belge değişmemiş, atlanıyor: {Path(pdf_path).name}")
+            return True
+        
+        if new_hash in self.documents:
+            print(f"[WARNING] Bu içerik zaten yüklü ({self.documents[new_hash]['name']}), belge değiştirilmedi")
+            return False
+        
+        if total_pages == 0:
+            print(f"[ERROR] PDF'te sayfa yok, belge değiştirilmedi: {pdf_path}")
+            return False
+        
+        self.add_documents([pdf_path], save=False)
+        if new_hash not in self.documents:
+            print(f"[ERROR] Yeni PDF eklenemedi, eski belge korunuyor: {Path(pdf_path).name}")
+            return False
+        
+        if old_hash is not None:
+            self.remove_document(old_hash, save=False)
+        
+        self.save_database()
+        return True
+    
+    def search(self, query: str, top_k: int = 4, mode: str = None) -> List[Dict]:  # top_k 3'ten 4'e çıktı
+        """
+        Sorguya en yakın parçaları bul
+        
+        Args:
+            query: Kullanıcı sorusu
+            top_k: Kaç parça döndürülecek
+            mode: "hybrid", "dense" veya "sparse" (None ise self.search_mode)
+            
+        Returns:
+            List[Dict]: En benzer parçalar. similarity_score her modda embedding benzerliğidir
+                        ("sparse" modunda sorgu encode edilmediği için en iyi BM25 skoruna oranı);
+                        hibrit modda sıralama rrf_score'a göredir, bm25_score da eklenir.
+        """
+        results = self.search_batch([query], top_k, mode)[0]
+        
+        print(f"[DEBUG] RAG arama sonuçları ({mode or self.search_mode}, top {top_k}):")
         for i, r in enumerate(results, 1):
             print(f"  [{i}] Skor: {r['similarity_score']:.3f} - {r['text'][:100]}...")
         
         return results
     
-    def get_context_for_query(self, query: str, top_k: int = 4) -> str:  # top_k parametresi güncellendi
+    def search_batch(self, queries: List[str], top_k: int = 4, mode: str = None) -> List[List[Dict]]:
         """
-        Sorguya göre context metni oluştur
+        Birden fazla sorguyu birlikte ara: önbellekte olmayan sorgular tek bir encode
+        çağrısıyla vektöre çevrilir ve FAISS'te tek bir search ile taranır
+        
+        Args:
+            queries: Sorgular
+            top_k: Sorgu başına kaç parça döndürülecek
+            mode: "hybrid", "dense" veya "sparse" (None ise self.search_mode)
+            
+        Returns:
+            List[List[Dict]]: Her sorgu için search() ile aynı biçimde sonuçlar (sorgu sırasıyla)
+        """
+        mode = mode or self.search_mode
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Geçersiz arama modu: {mode} (seçenekler: {', '.join(SEARCH_MODES)})")
+        
+        with self._index_lock.read():
+            if self.index is None or not self.chunks:
+                print("[WARNING] Vektör database boş!")
+                return [[] for _ in queries]
+        
+        results = [None] * len(queries)
+        
+        # Index ve sorgu modeli birlikte alınır (arka plan yeniden embed index'i değiştirebilir)
+        with self._swap_lock:
+            index = self.index
+            
+            # Aynı soru daha önce sorulduysa encoder ve FAISS taraması atlanır
+            cache_keys = [(self.index_model_name, mode, normalize_query(query), top_k, self.nprobe, self.ef_search)
+                          for query in queries]
+            pending = []  # Önbellekte olmayan sorguların sırası
+            for i, cache_key in enumerate(cache_keys):
+                cached = self.results_cache.get(cache_key)
+                if cached is not None:
+                    results[i] = [dict(r) for r in cached]
+                else:
+                    pending.append(i)
+            
+            if not pending:
+                print(f"[DEBUG] RAG arama sonuçları önbellekten ({len(queries)} sorgu, top {top_k})")
+                return results
+            
+            # Sorgu embedding'leri (sadece BM25 aramasında gerekmez)
+            query_embeddings = None
+            if mode != "sparse":
+                query_embeddings = self._embed_queries([queries[i] for i in pending])
+        
+        n_candidates = top_k if mode == "dense" else max(top_k, self.hybrid_candidates)
+        
+        # Index, chunk ve BM25 okumaları yükleme / silme / kaydetme ile aynı anda yapılmaz
+        with self._index_lock.read():
+            # Dense: tüm sorgular için tek FAISS araması
+            if query_embeddings is not None:
+                self._apply_search_params(index)
+                distances, indices = index.search(query_embeddings, n_candidates)
+        
+            for row, i in enumerate(pending):
+                dense_hits = []  # (chunk id, benzerlik)
+                if query_embeddings is not None:
+                    dense_hits = [(int(idx), self._score(distance))
+                                  for idx, distance in zip(indices[row], distances[row]) if int(idx) in self.chunks]
+            
+                # Sparse: BM25
+                sparse_hits = []  # (chunk id, BM25 skoru)
+                if mode != "dense":
+                    sparse_hits = [(vector_id, score)
+                                   for vector_id, score in self.sparse_index.search(queries[i], n_candidates)
+                                   if vector_id in self.chunks]
+            
+                query_embedding = query_embeddings[row:row + 1] if query_embeddings is not None else None
+                results[i] = self._merge_hits(mode, top_k, dense_hits, sparse_hits, index, query_embedding)
+                self.results_cache.put(cache_keys[i], [dict(r) for r in results[i]])
+        
+            return results
+    
+    def _merge_hits(self, mode: str, top_k: int, dense_hits: List[Tuple[int, float]],
+                    sparse_hits: List[Tuple[int, float]], index, query_embedding) -> List[Dict]:
+        """Dense ve BM25 adaylarını arama moduna göre sıralı sonuç listesine çevir"""
+        results = []
+        if mode == "dense":
+            for vector_id, similarity in dense_hits:
+                result = self.chunks[vector_id]  # Sadece bulunan chunk diskten okunur
+                result["similarity_score"] = similarity
+                results.append(result)
+            results.sort(key=lambda x: x['similarity_score'], reverse=True)
+        
+        elif mode == "sparse":
+            best = sparse_hits[0][1] if sparse_hits else 1.0
+            for vector_id, bm25 in sparse_hits[:top_k]:
+                result = self.chunks[vector_id]
+                result["similarity_score"] = bm25 / best
+                result["bm25_score"] = bm25
+                results.append(result)
+        
+        else:
+            # Reciprocal rank fusion: iki listedeki sıralar birleştirilir (skor ölçekleri farklı)
+            fused = {}
+            for hits in (dense_hits, sparse_hits):
+                for rank, (vector_id, _) in enumerate(hits, 1):
+                    fused[vector_id] = fused.get(vector_id, 0.0) + 1.0 / (self.rrf_k + rank)
+            
+            similarities = dict(dense_hits)
+            bm25_scores = dict(sparse_hits)
+            for vector_id, rrf in sorted(fused.items(), key=lambda item: item[1], reverse=True)[:top_k]:
+                result = self.chunks[vector_id]
+                if vector_id in similarities:
+                    result["similarity_score"] = similarities[vector_id]
+                else:
+                    # Sadece BM25'in bulduğu parça: benzerlik index'teki vektöründen hesaplanır
+                    result["similarity_score"] = self._vector_similarity(index, query_embedding, vector_id)
+                result["bm25_score"] = bm25_scores.get(vector_id, 0.0)
+                result["rrf_score"] = rrf
+                results.append(result)
+        
+        return results
+    
+    def _vector_similarity(self, index, query_embedding: np.ndarray, vector_id: int) -> float:
+        """Sorgu ile index'teki bir vektörün benzerlik skoru (FAISS aramasıyla aynı ölçekte)"""
+        try:
+            vector = index.reconstruct(int(vector_id))
+        except RuntimeError:
+            return 0.0
+        query = query_embedding[0]
+        if self.metric == "cosine":
+            return self._score(float(np.dot(query, vector)))
+        return self._score(float(np.sum((query - vector) ** 2)))  # FAISS L2 = kare uzaklık
+    
+    def _get_reranker(self):
+        """Cross-encoder modelini döndür, yüklenmemişse yükle"""
+        if self._reranker is None:
+            with self._embedder_lock:
+                if self._reranker is None:
+                    print(f"[INFO] Yeniden sıralama modeli yükleniyor: {self.reranker_model_name}")
+                    self._reranker = CrossEncoder(self.reranker_model_name)
+                    self._rerank_executor = ThreadPoolExecutor(max_workers=1)
+                    print("[SUCCESS] Yeniden sıralama modeli yüklendi!")
+        return self._reranker
+    
+    def rerank(self, query: str, hits: List[Dict], top_k: int = 4) -> List[Dict]:
+        """
+        Adayları cross-encoder ile tek bir batch'te yeniden skorla ve en iyi top_k'yı döndür
+        Süre bütçesi (rerank_budget_ms) aşılırsa veya önceki yeniden sıralama hâlâ sürüyorsa
+        adaylar geldiği (arama) sırasıyla döndürülür.
         
         Args:
             query: Kullanıcı sorusu
-            top_k: Kaç parça kullanılacak
+            hits: search() sonuçları
+            top_k: Döndürülecek parça sayısı
             
         Returns:
-            str: Format edilmiş context
+            List[Dict]: Yeniden sıralandıysa "rerank_score" eklenmiş sonuçlar
         """
-        results = self.search(query, top_k)
+        if not hits:
+            return hits
+        reranker = self._get_reranker()
         
-        if not results:
-            return ""
+        if self._rerank_future is not None and not self._rerank_future.done():
+            print("[WARNING] Önceki yeniden sıralama sürüyor, arama sırası kullanılıyor")
+            return hits[:top_k]
         
-        filtered_results = [r for r in results if r['similarity_score'] > 0.3]
+        # Önceki çağrıların süresine göre bütçeye sığacak kadar aday al
+        candidates = hits
+        if self._rerank_pair_ms:
+            candidates = hits[:max(top_k, int(0.8 * self.rerank_budget_ms / self._rerank_pair_ms))]
         
-        if not filtered_results:
-            print("[WARNING] Yeterince benzer context bulunamadı (skor < 0.3)")
-            return ""
+        pairs = [(query, hit["text"]) for hit in candidates]
+        start = time.perf_counter()
+        self._rerank_future = self._rerank_executor.submit(
+            reranker.predict, pairs, batch_size=len(pairs), show_progress_bar=False
+        )
+        try:
+            scores = self._rerank_future.result(timeout=self.rerank_budget_ms / 1000)
+        except FutureTimeoutError:
+            print(f"[WARNING] Yeniden sıralama {self.rerank_budget_ms} ms bütçeyi aştı, arama sırası kullanılıyor")
+            self._rerank_pair_ms = 2 * self.rerank_budget_ms / len(pairs)  # En az iki katı sürecek sayılır
+            return hits[:top_k]
+        
+        pair_ms = (time.perf_counter() - start) * 1000 / len(pairs)
+        self._rerank_pair_ms = pair_ms if self._rerank_pair_ms is None else 0.7 * self._rerank_pair_ms + 0.3 * pair_ms
+        
+        reranked = []
+        for hit, score in zip(candidates, scores):
+            hit = dict(hit)
+            hit["rerank_score"] = float(score)
+            reranked.append(hit)
+        reranked.sort(key=lambda x: x["rerank_score"], reverse=True)
+        
+        print(f"[DEBUG] Yeniden sıralama: {len(pairs)} aday, {pair_ms * len(pairs):.0f} ms")
+        return reranked[:top_k]
+    
+    def retrieve(self, query: str, top_k: int = 4) -> RetrievalResult:
+        """
+        Tek aramayla context metnini, ham sonuçları ve skorları birlikte döndür
+        (Sorgu bir kez encode edilir, FAISS bir kez taranır.)
+        Yeniden sıralama açıksa rerank_candidates aday aranır ve cross-encoder ile top_k'ya indirilir.
+        
+        Args:
+            query: Kullanıcı sorusu
+            top_k: Kaç parça aranacak
+            
+        Returns:
+            RetrievalResult: context, hits, used_hits, scores, avg_similarity
+        """
+        threshold = self.get_similarity_threshold()
+        result = RetrievalResult(query=query, threshold=threshold)
+        if self.reranker_model_name:
+            candidates = self.search(query, max(top_k, self.rerank_candidates))
+            result.hits = self.rerank(query, candidates, top_k)
+        else:
+            result.hits = self.search(query, top_k)
+        
+        if not result.hits:
+            return result
+        
+        result.used_hits = [r for r in result.hits if r['similarity_score'] > threshold]
+        
+        if not result.used_hits:
+            print(f"[WARNING] Yeterince benzer context bulunamadı (skor < {threshold})")
+            return result
         
         context_parts = []
-        for i, result in enumerate(filtered_results, 1):
-            context_parts.append(f"[BELGE {i}]:\n{result['text']}\n")
+        for i, hit in enumerate(result.used_hits, 1):
+            context_parts.append(f"[BELGE {i}]:\n{hit['text']}\n")
         
-        context = "\n".join(context_parts)
-        return context
+        result.context = "\n".join(context_parts)
+        return result
     
+    def get_context_for_query(self, query: str, top_k: int = 4) -> str:  # top_k parametresi güncellendi
+        """
+        Sorguya göre context metni oluştur
+        
+        Args:
+            query: Kullanıcı sorusu
+            top_k: Kaç parça kullanılacak
+            
+        Returns:
+            str: Format edilmiş context
+        """
+        return self.retrieve(query, top_k).context
+    
+    def _read_index(self, index_path: str):
+        """
+        FAISS index'i memory-map ile aç (dosya bir kez, tembel okunur)
+        mmap desteklenmezse normal okumaya düşülür.
+        """
+        try:
+            index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+            self._mmapped_index = index
+        except Exception:
+            index = faiss.read_index(index_path)
+            self._mmapped_index = None
+        self._index_path = index_path
+        return index
+    
+    def _ensure_writable_index(self):
+        """
+        mmap ile açılmış index salt okunurdur; ilk değişiklikten önce belleğe tam yüklenir
+        (diskteki dosya mmap'lenmiş index ile aynı olduğu için tekrar okumak yeterli)
+        """
+        if self._mmapped_index is not None and self.index is self._mmapped_index:
+            self.index = faiss.read_index(self._index_path)
+        self._mmapped_index = None
+    
+    def _current_manifest(self):
+        """
+        CURRENT neslinin manifest'i (doğrulama yapılmaz)
+        Nesil düzeninden önceki database'lerde kök klasördeki manifest okunur (yoksa None).
+        """
+        current = db_generations.read_current(self.vector_db_path)
+        if current:
+            manifest = db_generations.read_manifest(os.path.join(self.vector_db_path, current))
+            if manifest is not None:
+                return manifest
+        return db_generations.read_manifest(self.vector_db_path)
+    
+    def _manifest_info(self) -> Dict:
+        """Manifest'e yazılacak database bilgileri"""
+        model_name = self.index_model_name or self.embedding_model_name
+        return {
+            "embedding_model": model_name,
+            "embedding_backend": self._loaded_backend(model_name),
+            "dimension": int(self.index.d),
+            "metric": self.metric,
+            "index_type": self._index_kind(self.index),
+            "chunk_count": len(self.chunks),
+            "document_count": len(self.documents),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+    
+    def _remove_legacy_files(self):
+        """Nesil düzeninden önceki (doğrudan vector_db/ altındaki) dosyaları sil"""
+        for name in ("index.faiss", "chunks.pkl", "documents.json", "manifest.json"):
+            path = os.path.join(self.vector_db_path, name)
+            if os.path.exists(path):
+                os.remove(path)
+        legacy_store = os.path.join(self.vector_db_path, "chunks")
+        if os.path.isdir(legacy_store):
+            shutil.rmtree(legacy_store, ignore_errors=True)
+    
+    @_locked
     def save_database(self):
-        """Vektör database'i diske kaydet"""
+        """
+        Vektör database'i yeni bir nesil klasörüne kaydet
+        Tüm dosyalar yazılıp manifest (checksum'lar) oluşturulduktan sonra CURRENT atomik olarak
+        yeni nesli gösterir. Kayıt yarıda kesilirse önceki nesil geçerli kalır.
+        Son iki nesil tutulur (yeni nesil bozuk çıkarsa bir öncekine dönülür).
+        """
         try:
+            gen_dir = db_generations.new_generation(self.vector_db_path)
+            
             # FAISS index
-            faiss.write_index(self.index, os.path.join(self.vector_db_path, "index.faiss"))
+            index_path = os.path.join(gen_dir, "index.faiss")
+            faiss.write_index(self.index, index_path)
+            
+            # Chunks (ikili, memory-map edilebilir store; text.bin önceki nesilden hard link ile devralınır)
+            # Kayıt sırasında mmap'ler kapatılıp yeniden açıldığı için aramalar bu sırada bekler
+            with self._index_lock.write():
+                self.chunks.save(os.path.join(gen_dir, "chunks"))
+            self.chunk_store_path = self.chunks.directory
+            
+            # BM25 ters indeksi
+            self.sparse_index.save(os.path.join(gen_dir, "sparse.npz"))
             
-            # Chunks
-            with open(os.path.join(self.vector_db_path, "chunks.pkl"), 'wb') as f:
-                pickle.dump(self.chunks, f)
+            # Belge tablosu (içerik hash'i -> belge bilgisi)
+            with open(os.path.join(gen_dir, "documents.json"), 'w', encoding='utf-8') as f:
+                json.dump(self.documents, f, ensure_ascii=False, indent=2)
             
-            print(f"[SUCCESS] Database kaydedildi: {self.vector_db_path}")
+            # Manifest en son yazılır, ardından CURRENT yeni nesle çevrilir
+            db_generations.write_manifest(gen_dir, self._manifest_info(), append_only=["chunks/text.bin"])
+            db_generations.publish(self.vector_db_path, gen_dir)
+            
+            # Değişmemiş (mmap'li) index artık yeni nesildeki dosyadan okunur
+            if self._mmapped_index is not None and self.index is self._mmapped_index:
+                with self._index_lock.write():
+                    self.index = self._read_index(index_path)
+            
+            db_generations.prune(self.vector_db_path,
+                                 keep=[gen_dir, self.generation_dir, self._reembed_source_dir])
+            self.generation_dir = gen_dir
+            self._remove_legacy_files()
+            
+            print(f"[SUCCESS] Database kaydedildi: {gen_dir}")
         except Exception as e:
             print(f"[ERROR] Database kaydetme hatası: {str(e)}")
     
+    @_locked
     def load_database(self):
-        """Vektör database'i diskten yükle"""
+        """
+        Vektör database'i diskten yükle
+        CURRENT'ın gösterdiği nesil manifest'e göre doğrulanır; bozuksa en yeni sağlam nesil yüklenir.
+        Embedding modeli değiştiyse eski index sorgulara cevap vermeye devam ederken kayıtlı
+        parçalar arka planda yeni modelle yeniden embed edilir (start_reembed).
+        """
+        self._stop_reembed()
         try:
-            index_path = os.path.join(self.vector_db_path, "index.faiss")
-            chunks_path = os.path.join(self.vector_db_path, "chunks.pkl")
+            gen_dir, manifest = db_generations.find_generation(self.vector_db_path, full=self.verify_checksums)
+            if gen_dir is None:
+                # Nesil düzeninden önceki database: dosyalar doğrudan vector_db/ altında
+                base_dir = self.vector_db_path
+                manifest = db_generations.read_manifest(base_dir)
+            else:
+                base_dir = gen_dir
+            
+            index_path = os.path.join(base_dir, "index.faiss")
+            store_path = os.path.join(base_dir, "chunks")
+            legacy_chunks_path = os.path.join(base_dir, "chunks.pkl")
             
-            if not os.path.exists(index_path) or not os.path.exists(chunks_path):
+            # Eski pickle formatı: açılış yolunda kalmaması için bir kez ikili store'a çevrilip silinir
+            if os.path.exists(index_path) and not ChunkStore.exists(store_path) and os.path.exists(legacy_chunks_path):
+                self._convert_legacy_pickle(legacy_chunks_path, store_path)
+            
+            if not os.path.exists(index_path) or not ChunkStore.exists(store_path):
                 print("[INFO] Kaydedilmiş database bulunamadı")
                 return False
             
-            # FAISS index
-            self.index = faiss.read_index(index_path)
+            # FAISS index (mmap ile, tek okuma)
+            self.index = self._read_index(index_path)
+            
+            # Chunks: memory-map ile açılır, metinler arama sonucunda okunur
+            self.chunks = ChunkStore.open(store_path)
+            self.chunk_store_path = store_path
+            
+            # Belge tablosu (eski database'lerde bulunmayabilir)
+            documents_path = os.path.join(base_dir, "documents.json")
+            if os.path.exists(documents_path):
+                with open(documents_path, 'r', encoding='utf-8') as f:
+                    self.documents = json.load(f)
+            else:
+                self.documents = {}
+            
+            self.generation_dir = gen_dir
             
-            # Chunks
-            with open(chunks_path, 'rb') as f:
-                self.chunks = pickle.load(f)
+            # Index'i üreten model (manifest'i olmayan eski database'de boyut aynıysa aynı model sayılır)
+            self.index_backend = manifest.get("embedding_backend") if manifest is not None else None
+            if manifest is not None:
+                self.index_model_name = manifest.get("embedding_model")
+            else:
+                current_dimension = self._get_embedder(self.embedding_model_name).get_sentence_embedding_dimension()
+                if self.index.d == current_dimension:
+                    self.index_model_name = self.embedding_model_name
+                else:
+                    print(f"[WARNING] Embedding boyutu uyuşmuyor! Index: {self.index.d}, Model: {current_dimension}")
+                    self.index_model_name = None
             
-            print(f"[SUCCESS] Database yüklendi: {len(self.chunks)} parça")
+            changed = self._migrate_legacy_database()
+            
+            # BM25 indeksi (bu özellikten önceki database'lerde yok: chunk'lardan bir kez kurulur)
+            sparse_path = os.path.join(base_dir, "sparse.npz")
+            self.sparse_index = SparseIndex.load(sparse_path) if os.path.exists(sparse_path) else None
+            if self.sparse_index is None or len(self.sparse_index) != len(self.chunks):
+                print("[INFO] BM25 indeksi chunk'lardan kuruluyor...")
+                self.sparse_index = SparseIndex.build(self.chunks.items())
+                changed = True
+            if self.index_model_name is None:
+                # Eski index'in modeli bilinmiyor, sorgulanamaz: yeniden embed beklenerek yapılır
+                self._reembed_database()
+                changed = True
+            else:
+                changed = self._sync_metric() or changed
+            self._on_index_changed()
+            
+            if changed or gen_dir is None:
+                self.save_database()
+            
+            print(f"[SUCCESS] Database yüklendi: {len(self.chunks)} parça, {len(self.documents)} belge")
+            
+            if self.index_model_name != self.embedding_model_name:
+                self.start_reembed()
             return True
             
         except Exception as e:
             print(f"[ERROR] Database yükleme hatası: {str(e)}")
             return False
     
-    def _check_and_reset_database(self):
+    def _embed_stored_chunks(self, store, ids, model_name: str, index=None, on_batch=None):
+        """
+        Store'daki parçaları verilen modelle embed edip index'e ekle
+        
+        Args:
+            store: ChunkStore (metinlerin okunacağı)
+            ids: Embed edilecek chunk id'leri
+            model_name: Embedding modeli
+            index: Eklenecek index (None ise flat index oluşturulur)
+            on_batch: Her paketten sonra işlenen parça sayısıyla çağrılır; False dönerse iş durdurulur
+        
+        Returns:
+            Index veya durdurulduysa None
+        """
+        step = self.embed_window_size
+        for start in range(0, len(ids), step):
+            batch_ids = np.asarray(ids[start:start + step], dtype='int64')
+            embeddings, _, _, _ = self._embed_chunk_texts([store[vector_id]["text"] for vector_id in batch_ids],
+                                                          model_name=model_name)
+            if index is None:
+                index = self._create_index(embeddings.shape[1], "flat")
+            index.add_with_ids(embeddings, batch_ids)
+            
+            if on_batch is not None and on_batch(min(start + step, len(ids))) is False:
+                return None
+        
+        if index is None:
+            index = self._create_index(self._get_embedder(model_name).get_sentence_embedding_dimension(), "flat")
+        return index
+    
+    def _swap_index(self, new_index, model_name: str):
+        """Yeni modelle kurulan index'i devreye al (sorgular eski ya da yeni çifti görür, karışığını değil)"""
+        with self._swap_lock:
+            old_model = self.index_model_name
+            self.index = new_index
+            self._mmapped_index = None
+            self.index_model_name = model_name
+            self.query_cache.clear()
+            self._on_index_changed()
+        if old_model != model_name:
+            self._embedders.pop(old_model, None)  # Eski modeli bellekten bırak
+            self._embedder_backends.pop(old_model, None)
+        self._maybe_rebuild_index()
+    
+    def _reembed_database(self):
+        """
+        Kayıtlı parça metinlerini mevcut embedding modeliyle yeniden embed edip index'i kur
+        (PDF'ler tekrar okunmaz, chunk id'leri ve belge tablosu korunur). İş bitene kadar bekler.
+        """
+        ids = self.chunks.ids()
+        print(f"[INFO] {len(ids)} parça yeni embedding modeliyle yeniden embed ediliyor: {self.embedding_model_name}")
+        
+        def report(done):
+            if self.progress_callback:
+                self.progress_callback(100 * done / len(ids), f"Yeniden embed: {done}/{len(ids)} parça")
+        
+        new_index = self._embed_stored_chunks(self.chunks, ids, self.embedding_model_name, on_batch=report)
+        self._swap_index(new_index, self.embedding_model_name)
+        print(f"[SUCCESS] Yeniden embed tamamlandı ({len(ids)} parça, {self.index.d} boyut)")
+    
+    def start_reembed(self):
         """
-        Mevcut database'in embedding boyutunu kontrol et.
-        Uyumsuzluk varsa database'i sil ve yeniden oluşturmaya zorla.
+        Kayıtlı parçaları arka planda yeni embedding modeliyle yeniden embed et
+        Eski index ve modeli iş bitene kadar sorgulara cevap verir; yeni index gölge olarak
+        kurulur, bu sırada eklenen/silinen belgeler işlenir ve index tek adımda değiştirilir.
         """
+        if self._reembed_thread is not None and self._reembed_thread.is_alive() \
+                and not self._reembed_stop.is_set():
+            return
+        
+        # Gölge index kayıtlı nesilden okunur (ana store'daki değişikliklerle çakışmaz)
+        source = ChunkStore.open(self.chunks.directory)
+        self._reembed_source_dir = self.generation_dir
+        self._reembed_stop = threading.Event()
+        self._reembed_state = {
+            "model": self.embedding_model_name,
+            "done": 0,
+            "total": len(source),
+            "running": True,
+            "error": None,
+        }
+        print(f"[INFO] Arka planda yeniden embed başlatıldı: {len(source)} parça -> {self.embedding_model_name} "
+              f"(bu sırada {self.index_model_name} ile arama yapılır)")
+        self._reembed_thread = threading.Thread(
+            target=self._reembed_worker, args=(source, self._reembed_state, self._reembed_stop), daemon=True
+        )
+        self._reembed_thread.start()
+    
+    def _reembed_worker(self, source: ChunkStore, state: Dict, stop: threading.Event):
+        """Arka plan yeniden embed işi (start_reembed)"""
+        model_name = state["model"]
+        
+        def report(done):
+            state["done"] = done
+            return not stop.is_set()
+        
         try:
-            index_path = os.path.join(self.vector_db_path, "index.faiss")
+            source_ids = source.ids()
+            shadow = self._embed_stored_chunks(source, source_ids, model_name, on_batch=report)
+            if shadow is None:
+                return
             
-            if os.path.exists(index_path):
-                # Mevcut index'i yükle
-                temp_index = faiss.read_index(index_path)
+            with self._write_lock:
+                if stop.is_set():
+                    return
                 
-                # Test embedding boyutunu al
-                test_embedding = self.embedder.encode(["test"])
-                current_dimension = test_embedding.shape[1]
+                # İş sürerken eklenen / silinen parçalar
+                current_ids = self.chunks.ids()
+                removed = np.setdiff1d(source_ids, current_ids)
+                if len(removed):
+                    shadow.remove_ids(removed.astype('int64'))
+                added = np.setdiff1d(current_ids, source_ids)
+                shadow = self._embed_stored_chunks(self.chunks, added, model_name, index=shadow)
                 
-                # Index boyutunu kontrol et
-                if temp_index.d != current_dimension:
-                    print(f"[WARNING] Embedding boyutu uyuşmuyor! Index: {temp_index.d}, Model: {current_dimension}")
-                    print(f"[INFO] Eski database siliniyor ve yeniden oluşturulacak...")
-                    
-                    # Eski dosyaları sil
-                    if os.path.exists(index_path):
-                        os.remove(index_path)
-                    chunks_path = os.path.join(self.vector_db_path, "chunks.pkl")
-                    if os.path.exists(chunks_path):
-                        os.remove(chunks_path)
-                    
-                    print("[SUCCESS] Eski database temizlendi. Lütfen PDF'leri yeniden yükleyin.")
-                    return False
-                else:
-                    print(f"[INFO] Database boyutu uyumlu ({current_dimension} boyut)")
-                    return True
+                self._swap_index(shadow, model_name)
+                self._reembed_source_dir = None
+                self.save_database()
+            
+            print(f"[SUCCESS] Arka plan yeniden embed tamamlandı: {len(current_ids)} parça, model: {model_name}")
         except Exception as e:
-            print(f"[WARNING] Database kontrol hatası: {str(e)}")
+            state["error"] = str(e)
+            print(f"[ERROR] Arka plan yeniden embed hatası: {str(e)}")
+        finally:
+            state["running"] = False
+            if self._reembed_state is state:
+                self._reembed_source_dir = None
+            source._close_files()
+    
+    def _stop_reembed(self):
+        """
+        Süren arka plan yeniden embed işini durdur
+        Beklenmez: iş bir sonraki pakette veya index'i değiştirmeden önce durur
+        (_write_lock tutulurken çağrılabilir).
+        """
+        self._reembed_stop.set()
+        if self._reembed_state.get("running"):
+            print("[INFO] Arka plan yeniden embed durduruldu")
+        self._reembed_source_dir = None
+    
+    def reembed_status(self) -> Dict:
+        """
+        Arka plan yeniden embed işinin durumu
+        
+        Returns:
+            Dict: model, done, total, running, error (iş hiç başlamadıysa boş)
+        """
+        return dict(self._reembed_state)
+    
+    def wait_for_reembed(self, timeout: float = None) -> bool:
+        """
+        Arka plan yeniden embed işinin bitmesini bekle
+        
+        Returns:
+            bool: İş bittiyse (veya yoksa) True
+        """
+        thread = self._reembed_thread
+        if thread is None:
+            return True
+        thread.join(timeout)
+        return not thread.is_alive()
+    
+    @staticmethod
+    def _convert_legacy_pickle(pickle_path: str, store_path: str):
+        """
+        Eski chunks.pkl'i bir kez ikili chunk store'a çevir ve sil
+        Sonraki açılışlarda pickle okunmaz; store memory-map ile açılır.
+        """
+        print("[INFO] Eski chunks.pkl bulundu, ikili chunk store'a dönüştürülüyor (tek seferlik)")
+        with open(pickle_path, 'rb') as f:
+            chunks = pickle.load(f)
+        if isinstance(chunks, list):
+            chunks = dict(enumerate(chunks))
+        
+        store = ChunkStore(store_path)
+        store.update(chunks)
+        store.save()
+        os.remove(pickle_path)
+    
+    def _migrate_legacy_database(self) -> bool:
+        """
+        Eski formattaki database'i (düz IndexFlatL2, belge tablosu olmayan chunk'lar) id eşlemeli
+        formata çevir. Vektörler index'ten geri okunur, yeniden embed gerekmez.
+        
+        Returns:
+            bool: Dönüştürme yapıldıysa True (database kaydedilmeli)
+        """
+        migrated = False
+        
+        if isinstance(self.index, faiss.IndexFlat):
+            vectors = self.index.reconstruct_n(0, self.index.ntotal)
+            new_index = self._create_index(self.index.d, "flat")
+            new_index.add_with_ids(vectors, np.arange(self.index.ntotal, dtype='int64'))
+            self.index = new_index
+            migrated = True
+        
+        # Belge -> chunk id tablosunu chunk'lardan yeniden kur
+        if any("chunk_ids" not in info for info in self.documents.values()) or \
+                sum(len(info["chunk_ids"]) for info in self.documents.values()) != len(self.chunks):
+            for info in self.documents.values():
+                info["chunk_ids"] = []
+            for vector_id, chunk in self.chunks.items():
+                doc_hash = chunk.get("doc_hash")
+                if doc_hash not in self.documents:
+                    # Hash'i bilinmeyen eski chunk'lar kaynak yoluna göre gruplanır
+                    doc_hash = "legacy-" + hashlib.sha256(chunk["source"].encode('utf-8')).hexdigest()
+                    chunk["doc_hash"] = doc_hash
+                    self.chunks[vector_id] = chunk
+                    self.documents.setdefault(doc_hash, {
+                        "source": chunk["source"],
+                        "name": Path(chunk["source"]).name,
+                        "chunk_count": 0,
+                        "chunk_ids": []
+                    })
+                self.documents[doc_hash]["chunk_ids"].append(vector_id)
+                self.documents[doc_hash]["chunk_count"] = len(self.documents[doc_hash]["chunk_ids"])
+            migrated = True
+        
+        self.next_chunk_id = self.chunks.max_id() + 1
+        
+        if migrated:
+            print("[INFO] Database yeni formata dönüştürüldü (belge bazlı silme destekleniyor)")
+        return migrated
+    
+    def _sync_metric(self) -> bool:
+        """
+        Kayıtlı index'in ölçütünü ayarla uyumlu hale getir.
+        L2 -> cosine: vektörler normalize edilip inner product index kurulur (yeniden embed yok).
+        cosine -> L2: normalize vektörlerin eski uzunlukları bilinmediğinden cosine kullanılmaya devam edilir.
+        
+        Returns:
+            bool: Index yeniden kurulduysa True (database kaydedilmeli)
+        """
+        index_metric = "cosine" if self.index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+        if index_metric == self.metric:
             return False
+        
+        if self.metric == "cosine":
+            print("[INFO] Index L2'den kosinüs benzerliğine dönüştürülüyor...")
+            self._rebuild_index(self._index_kind(self.index))
+            return True
+        
+        print("[WARNING] Kayıtlı index kosinüs benzerliği kullanıyor, metric='cosine' ile devam ediliyor")
+        self.metric = "cosine"
+        self.query_cache.clear()  # Önbellekteki sorgu vektörleri normalize değil
+        return False
+    
+    def _check_and_reset_database(self):
+        """
+        Kayıtlı database'in hangi embedding modeliyle oluşturulduğunu manifest'ten kontrol et
+        (index okunmaz, test encode yapılmaz). Model değiştiyse database silinmez;
+        load_database kayıtlı parça metinlerini yeni modelle yeniden embed eder.
+        
+        Returns:
+            bool: Database mevcut modelle uyumluysa (veya yoksa) True
+        """
+        manifest = self._current_manifest()
+        if manifest is None:
+            return True
+        
+        if manifest.get("embedding_model") != self.embedding_model_name:
+            print(f"[WARNING] Embedding modeli değişmiş! Database: {manifest.get('embedding_model')}, "
+                  f"Ayar: {self.embedding_model_name}")
+            print("[INFO] Kayıtlı parçalar yüklenirken yeni modelle yeniden embed edilecek "
+                  "(PDF'lerin tekrar yüklenmesi gerekmez)")
+            return False
+        
+        print(f"[INFO] Database uyumlu ({manifest.get('dimension')} boyut, {manifest.get('chunk_count')} parça)")
+        return True
     
+    @_locked
     def clear_database(self):
         """
         Tüm database'i temizle (PDF'leri kalıcı olarak sil)
@@ -450,23 +2132,32 @@ class RAGManager:
         Returns:
             bool: Başarılı ise True
         """
+        self._stop_reembed()
         try:
-            index_path = os.path.join(self.vector_db_path, "index.faiss")
-            chunks_path = os.path.join(self.vector_db_path, "chunks.pkl")
-            
-            # Dosyaları sil
-            if os.path.exists(index_path):
-                os.remove(index_path)
-                print("[INFO] FAISS index silindi")
+            # Açık mmap'leri bırak (aramalar bitene kadar beklenir), sonra tüm nesilleri ve eski düzen dosyalarını sil
+            with self._index_lock.write():
+                self.index = None
+                self._mmapped_index = None
+                self.chunks.clear_files()
+                self.chunks = ChunkStore(self.chunk_store_path)
+                self.sparse_index = SparseIndex()
             
-            if os.path.exists(chunks_path):
-                os.remove(chunks_path)
-                print("[INFO] Chunks silindi")
+            for name in db_generations.list_generations(self.vector_db_path):
+                shutil.rmtree(os.path.join(self.vector_db_path, name), ignore_errors=True)
+            current_path = os.path.join(self.vector_db_path, db_generations.CURRENT_FILE)
+            if os.path.exists(current_path):
+                os.remove(current_path)
+            self._remove_legacy_files()
+            print("[INFO] FAISS index ve chunks silindi")
             
             # Memory'den temizle
-            self.index = None
-            self.chunks = []
+            self.generation_dir = None
+            self.index_model_name = None
+            self.index_backend = None
             self.metadata = []
+            self.documents = {}
+            self.next_chunk_id = 0
+            self._on_index_changed()
             
             print("[SUCCESS] Database tamamen temizlendi!")
             return True
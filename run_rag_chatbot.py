@@ -0,0 +1,11 @@
+"""
+Qwen RAG Chatbot Giriş Noktası
+PDF sayfaları process havuzunda okunur ve worker process'ler ana modülü yeniden import eder.
+Bu modül hafif tutulur; torch, transformers ve faiss sadece ana process'te yüklenir.
+
+Kullanım: python run_rag_chatbot.py
+"""
+
+if __name__ == "__main__":
+    from qwen_chatbot_rag import main
+    main()
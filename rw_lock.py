@@ -0,0 +1,80 @@
+"""
+Okuyucu / Yazıcı Kilidi
+Aramalar (FAISS index, chunk store ve BM25 okumaları) aynı anda çalışabilir; index'e
+vektör ekleyen / silen, chunk store'u kaydeden işlemler ise tek başına çalışır.
+FAISS aynı index üzerinde eşzamanlı search ile add_with_ids / remove_ids'i desteklemez.
+
+- Bekleyen yazıcı varsa yeni okuyucular bekler (yükleme sırasında aramalar yazıcıyı aç bırakmaz)
+- Yazma kilidi aynı thread'de tekrar alınabilir; yazıcı kendi okumalarında beklemez
+- Okuma kilidi aynı thread'de tekrar alınabilir (iç içe aramalar)
+"""
+
+import threading
+from contextlib import contextmanager
+
+
+class ReadWriteLock:
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._waiting_writers = 0
+        self._writer = None  # Yazma kilidini tutan thread
+        self._writer_depth = 0
+        self._local = threading.local()  # Thread başına okuma derinliği
+
+    @contextmanager
+    def read(self):
+        """Okuma kilidi (başka okuyucularla paylaşılır)"""
+        if self._writer == threading.get_ident():
+            yield
+            return
+
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0:
+            with self._cond:
+                while self._writer is not None or self._waiting_writers:
+                    self._cond.wait()
+                self._readers += 1
+        self._local.depth = depth + 1
+        try:
+            yield
+        finally:
+            self._local.depth -= 1
+            if self._local.depth == 0:
+                with self._cond:
+                    self._readers -= 1
+                    if not self._readers:
+                        self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        """Yazma kilidi (tek başına)"""
+        me = threading.get_ident()
+        if self._writer == me:
+            self._writer_depth += 1
+            try:
+                yield
+            finally:
+                self._writer_depth -= 1
+            return
+
+        if getattr(self._local, "depth", 0):
+            raise RuntimeError("Okuma kilidi tutulurken yazma kilidi alınamaz")
+
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._writer_depth = 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer_depth -= 1
+                if not self._writer_depth:
+                    self._writer = None
+                    self._cond.notify_all()
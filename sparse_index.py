@@ -0,0 +1,306 @@
+"""
+Türkçe BM25 Ters İndeksi
+Chunk metinleri üzerinde kelime bazlı (sparse) arama yapar; FAISS'in kaçırabildiği
+özel isim ve tarih gibi tam eşleşmeleri ("Malazgirt", "1071") öne çıkarır.
+
+- Türkçe küçük harf dönüşümü (İ -> i, I -> ı)
+- Kesme işaretinden sonraki ekler atılır ("Malazgirt'te" -> "malazgirt")
+- Kelimeler ilk 5 harfe kırpılır (Türkçe bilgi erişiminde yaygın, sözlüksüz kök bulma)
+- Belge eklendikçe / silindikçe indeks güncellenir (yeniden kurulum gerekmez)
+- Diskte pickle'sız .npz olarak (CSR benzeri dizilerle) saklanır; açılışta diziler
+  dict'e çevrilmez, sadece güncellenen terimler kopyalanır
+"""
+
+import re
+import math
+import heapq
+import unicodedata
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+
+SCHEMA_VERSION = 1
+
+# Kelime: harf/rakam dizisi (kesme işaretiyle ayrılan ek ayrı yakalanır ve atılır)
+_TOKEN_PATTERN = re.compile(r"[^\W_]+(?:['’][^\W_]+)?")
+_APOSTROPHES = ("'", "’")
+
+STEM_LENGTH = 5
+
+STOPWORDS = frozenset({
+    "ve", "veya", "ile", "bir", "bu", "şu", "o", "da", "de", "ki", "mi", "mı", "mu", "mü",
+    "için", "gibi", "kadar", "daha", "en", "çok", "her", "ne", "nasıl", "neden", "niçin",
+    "hangi", "kim", "kimdir", "nedir", "olan", "olarak", "ise", "ama", "fakat", "ancak",
+    "sonra", "önce", "göre", "diğer", "bazı", "tüm", "hem", "ya", "yani", "çünkü",
+})
+
+
+def turkish_lower(text: str) -> str:
+    """Türkçe kurallarıyla küçük harfe çevir (İ -> i, I -> ı)"""
+    return unicodedata.normalize('NFC', text).replace('İ', 'i').replace('I', 'ı').lower()
+
+
+def stem(token: str) -> str:
+    """Sözlüksüz kök: kelimenin ilk STEM_LENGTH harfi (sayılar olduğu gibi kalır)"""
+    if token.isdigit():
+        return token
+    return token[:STEM_LENGTH]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Metni BM25 terimlerine ayır
+
+    Returns:
+        List[str]: Küçük harfli, eki atılmış, kırpılmış terimler (stopword'ler hariç)
+    """
+    terms = []
+    for match in _TOKEN_PATTERN.finditer(turkish_lower(text)):
+        token = match.group()
+        for apostrophe in _APOSTROPHES:
+            token = token.split(apostrophe, 1)[0]
+        if token in STOPWORDS:
+            continue
+        terms.append(stem(token))
+    return terms
+
+
+class SparseIndex:
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        """
+        BM25 ters indeksi
+
+        Kaydedilmiş indeks açılışta Python dict'lerine çevrilmez: terim listeleri .npz'deki düz
+        dizilerde kalır (terim -> ikili arama). Bir terim güncellendiğinde sadece o terimin listesi
+        dict'e kopyalanır ve bundan sonra dict kullanılır.
+
+        Args:
+            k1: Terim frekansı doygunluğu
+            b: Belge uzunluğu normalizasyonu (0: yok, 1: tam)
+        """
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}  # terim -> {chunk id: terim frekansı} (değişen terimler)
+        self._lengths: Dict[int, int] = {}  # chunk id -> terim sayısı (yüklemeden sonra eklenenler)
+        self._total_length = 0
+        self._clear_base()
+
+    def _clear_base(self):
+        """Kaydedilmiş indeksin dizilerini bırak"""
+        self._base_terms = np.zeros(0, dtype=str)  # Sıralı terimler
+        self._base_offsets = np.zeros(1, dtype=np.int64)  # Terim i'nin listesi: [offsets[i], offsets[i + 1])
+        self._base_doc_ids = np.zeros(0, dtype=np.int64)
+        self._base_tfs = np.zeros(0, dtype=np.int32)
+        self._base_length_ids = np.zeros(0, dtype=np.int64)  # Sıralı chunk id'leri
+        self._base_lengths = np.zeros(0, dtype=np.int64)
+        self._base_removed = set()  # Kaydedilmiş chunk'lardan silinenlerin id'leri
+
+    def __len__(self) -> int:
+        return len(self._base_length_ids) - len(self._base_removed) + len(self._lengths)
+
+    def __contains__(self, doc_id) -> bool:
+        return self._length(int(doc_id)) is not None
+
+    def _base_term_range(self, term: str) -> Tuple[int, int]:
+        """Terimin kaydedilmiş dizilerdeki [başlangıç, bitiş) aralığı (yoksa boş)"""
+        i = int(np.searchsorted(self._base_terms, term))
+        if i < len(self._base_terms) and self._base_terms[i] == term:
+            return int(self._base_offsets[i]), int(self._base_offsets[i + 1])
+        return 0, 0
+
+    def _length(self, doc_id: int, default=None):
+        """Chunk'ın terim sayısı (indekste yoksa default)"""
+        length = self._lengths.get(doc_id)
+        if length is not None:
+            return length
+        if doc_id in self._base_removed:
+            return default
+        i = int(np.searchsorted(self._base_length_ids, doc_id))
+        if i < len(self._base_length_ids) and self._base_length_ids[i] == doc_id:
+            return int(self._base_lengths[i])
+        return default
+
+    def _editable_postings(self, term: str) -> Dict[int, int]:
+        """Terimin güncellenebilir listesi (kaydedilmiş listeden gerekirse kopyalanır)"""
+        postings = self._postings.get(term)
+        if postings is None:
+            start, end = self._base_term_range(term)
+            postings = dict(zip(self._base_doc_ids[start:end].tolist(), self._base_tfs[start:end].tolist()))
+            self._postings[term] = postings
+        return postings
+
+    # --- Güncelleme ---
+
+    def add(self, doc_id: int, text: str):
+        """Chunk'ı indekse ekle (aynı id varsa önce çıkarılır)"""
+        doc_id = int(doc_id)
+        if doc_id in self:
+            self.remove(doc_id, text)
+
+        counts: Dict[str, int] = {}
+        for term in tokenize(text):
+            counts[term] = counts.get(term, 0) + 1
+
+        for term, tf in counts.items():
+            self._editable_postings(term)[doc_id] = tf
+        length = sum(counts.values())
+        self._lengths[doc_id] = length
+        self._total_length += length
+
+    def remove(self, doc_id: int, text: str):
+        """
+        Chunk'ı indeksten çıkar
+
+        Args:
+            text: Chunk metni (hangi terim listelerinden silineceğini bulmak için)
+        """
+        doc_id = int(doc_id)
+        length = self._length(doc_id)
+        if length is None:
+            return
+        if self._lengths.pop(doc_id, None) is None:
+            self._base_removed.add(doc_id)
+        self._total_length -= length
+        # Boşalan liste silinmez: kaydedilmiş dizilerdeki eski listenin yerini tutar
+        for term in set(tokenize(text)):
+            self._editable_postings(term).pop(doc_id, None)
+
+    def clear(self):
+        self._postings = {}
+        self._lengths = {}
+        self._total_length = 0
+        self._clear_base()
+
+    # --- Arama ---
+
+    def _base_lengths_of(self, doc_ids: np.ndarray, default: float) -> np.ndarray:
+        """Kaydedilmiş bir terim listesindeki chunk'ların terim sayıları (bulunamayanlar için default)"""
+        lengths = np.full(len(doc_ids), default, dtype=np.float64)
+        if len(self._base_length_ids):
+            pos = np.minimum(np.searchsorted(self._base_length_ids, doc_ids), len(self._base_length_ids) - 1)
+            found = self._base_length_ids[pos] == doc_ids
+            lengths[found] = self._base_lengths[pos[found]]
+        if self._base_removed or self._lengths:
+            # Yüklemeden sonra silinen / yeniden eklenen chunk'lar
+            changed = np.fromiter(self._base_removed.union(self._lengths), dtype=np.int64)
+            for i in np.flatnonzero(np.isin(doc_ids, changed)).tolist():
+                lengths[i] = self._length(int(doc_ids[i]), default)
+        return lengths
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[int, float]]:
+        """
+        BM25 ile en iyi eşleşen chunk'ları bul
+
+        Returns:
+            List[Tuple[int, float]]: (chunk id, BM25 skoru), skora göre azalan
+        """
+        n_docs = len(self)
+        if not n_docs:
+            return []
+        avg_length = self._total_length / n_docs
+
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            postings = self._postings.get(term)
+            if postings is not None:
+                doc_ids = np.fromiter(postings.keys(), dtype=np.int64, count=len(postings))
+                tfs = np.fromiter(postings.values(), dtype=np.float64, count=len(postings))
+                lengths = np.array([self._length(doc_id, avg_length) for doc_id in doc_ids.tolist()],
+                                   dtype=np.float64)
+            else:
+                start, end = self._base_term_range(term)
+                doc_ids = self._base_doc_ids[start:end]
+                tfs = self._base_tfs[start:end].astype(np.float64)
+                lengths = self._base_lengths_of(doc_ids, avg_length)
+            df = len(doc_ids)
+            if not df:
+                continue
+            idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+            norm = tfs + self.k1 * (1 - self.b + self.b * lengths / avg_length)
+            for doc_id, score in zip(doc_ids.tolist(), (idf * tfs * (self.k1 + 1) / norm).tolist()):
+                scores[doc_id] = scores.get(doc_id, 0.0) + score
+
+        return heapq.nlargest(top_k, scores.items(), key=lambda item: item[1])
+
+    # --- Kaydetme / yükleme ---
+
+    def _iter_postings(self) -> Iterator[Tuple[str, np.ndarray, np.ndarray]]:
+        """Tüm terim listeleri: (terim, chunk id'leri, frekanslar), terime göre sıralı"""
+        changed = sorted(term for term, postings in self._postings.items() if postings)
+        base_terms = self._base_terms.tolist()
+        i = j = 0
+        while i < len(base_terms) or j < len(changed):
+            if j == len(changed) or (i < len(base_terms) and base_terms[i] < changed[j]):
+                term = base_terms[i]
+                i += 1
+                if term in self._postings:
+                    continue
+                start, end = int(self._base_offsets[i - 1]), int(self._base_offsets[i])
+                yield term, self._base_doc_ids[start:end], self._base_tfs[start:end]
+            else:
+                term = changed[j]
+                j += 1
+                if i < len(base_terms) and base_terms[i] == term:
+                    i += 1
+                postings = self._postings[term]
+                yield (term, np.fromiter(postings.keys(), dtype=np.int64, count=len(postings)),
+                       np.fromiter(postings.values(), dtype=np.int32, count=len(postings)))
+
+    def save(self, path: str):
+        """İndeksi .npz olarak kaydet (terim -> [chunk id, frekans] listeleri düz dizilerde)"""
+        terms = []
+        doc_id_parts = []
+        tf_parts = []
+        for term, doc_ids, tfs in self._iter_postings():
+            terms.append(term)
+            doc_id_parts.append(doc_ids)
+            tf_parts.append(tfs)
+        offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(doc_ids) for doc_ids in doc_id_parts], out=offsets[1:])
+
+        keep = ~np.isin(self._base_length_ids, np.fromiter(self._base_removed, dtype=np.int64))
+        length_ids = np.concatenate([self._base_length_ids[keep],
+                                     np.fromiter(self._lengths.keys(), dtype=np.int64, count=len(self._lengths))])
+        lengths = np.concatenate([self._base_lengths[keep],
+                                  np.fromiter(self._lengths.values(), dtype=np.int64, count=len(self._lengths))])
+
+        with open(path, 'wb') as f:
+            np.savez(
+                f,
+                version=np.array([SCHEMA_VERSION]),
+                params=np.array([self.k1, self.b]),
+                terms=np.array(terms, dtype=str),
+                offsets=offsets,
+                doc_ids=np.concatenate(doc_id_parts) if doc_id_parts else np.zeros(0, dtype=np.int64),
+                tfs=np.concatenate(tf_parts) if tf_parts else np.zeros(0, dtype=np.int32),
+                length_ids=length_ids,
+                lengths=lengths,
+            )
+
+    @classmethod
+    def load(cls, path: str) -> "SparseIndex":
+        """Kaydedilmiş indeksi yükle (diziler olduğu gibi kullanılır, dict'e çevrilmez)"""
+        with np.load(path, allow_pickle=False) as data:
+            if int(data["version"][0]) > SCHEMA_VERSION:
+                raise ValueError(f"Desteklenmeyen sparse indeks sürümü: {int(data['version'][0])}")
+            k1, b = data["params"].tolist()
+            index = cls(k1=k1, b=b)
+            index._base_terms = data["terms"]
+            index._base_offsets = data["offsets"]
+            index._base_doc_ids = data["doc_ids"]
+            index._base_tfs = data["tfs"]
+            length_ids = data["length_ids"]
+            lengths = data["lengths"]
+        order = np.argsort(length_ids, kind='stable')
+        index._base_length_ids = length_ids[order]
+        index._base_lengths = lengths[order]
+        index._total_length = int(lengths.sum())
+        return index
+
+    @classmethod
+    def build(cls, items: Iterable[Tuple[int, Dict]], **kwargs) -> "SparseIndex":
+        """(chunk id, chunk) çiftlerinden indeks kur"""
+        index = cls(**kwargs)
+        for doc_id, chunk in items:
+            index.add(doc_id, chunk["text"])
+        return index
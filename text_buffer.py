@@ -0,0 +1,93 @@
+"""
+Sayfa Duyarlı Metin Tamponu
+PDF sayfalarını tek bir string'e += ile eklemek yerine parça listesinde tutar,
+her sayfanın tampondaki başlangıç offset'ini hatırlar ve metni sadece
+gerektiğinde dilim/join ile oluşturur.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import List, Tuple
+
+
+class PageTextBuffer:
+    def __init__(self):
+        """Sayfa sınırlarını hatırlayan metin tamponu"""
+        self._parts: List[str] = []
+        self._starts: List[int] = []  # Her sayfanın tampondaki başlangıç offset'i
+        self._pages: List[int] = []  # Sayfa numaraları (PDF'teki sırası)
+        self._length = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def append(self, page_num: int, text: str) -> int:
+        """
+        Sayfa metnini tampona ekle (sonuna satır sonu eklenir)
+
+        Returns:
+            int: Sayfanın tampondaki başlangıç offset'i
+        """
+        start = self._length
+        part = text + "\n"
+        self._parts.append(part)
+        self._starts.append(start)
+        self._pages.append(page_num)
+        self._length += len(part)
+        return start
+
+    def page_spans(self, start: int = 0, end: int = None) -> List[Tuple[int, int]]:
+        """
+        [start, end) aralığıyla kesişen sayfalar
+
+        Returns:
+            List[Tuple[int, int]]: (aralık içindeki başlangıç offset'i, sayfa numarası)
+        """
+        end = self._length if end is None else min(end, self._length)
+        if start >= end:
+            return []
+        first = bisect_right(self._starts, start) - 1
+        last = bisect_left(self._starts, end)
+        return [(max(s - start, 0), page) for s, page in zip(self._starts[first:last], self._pages[first:last])]
+
+    def slice(self, start: int = 0, end: int = None) -> str:
+        """
+        [start, end) aralığındaki metni döndür
+        Sadece aralıkla kesişen sayfalar birleştirilir.
+        """
+        end = self._length if end is None else min(end, self._length)
+        if start >= end:
+            return ""
+        first = bisect_right(self._starts, start) - 1
+        last = bisect_left(self._starts, end)
+        joined = "".join(self._parts[first:last])
+        base = self._starts[first]
+        return joined[start - base:end - base]
+
+    @property
+    def text(self) -> str:
+        """Tampondaki tüm metin"""
+        return self.slice(0)
+
+    def consume(self, offset: int):
+        """
+        offset'ten önceki metni tampondan at
+        Kalan offset'ler 0'dan başlayacak şekilde kaydırılır.
+        """
+        if offset <= 0:
+            return
+        if offset >= self._length:
+            self.clear()
+            return
+        i = bisect_right(self._starts, offset) - 1
+        head = self._parts[i][offset - self._starts[i]:]
+        self._parts = [head] + self._parts[i + 1:]
+        self._pages = self._pages[i:]
+        self._starts = [0] + [s - offset for s in self._starts[i + 1:]]
+        self._length -= offset
+
+    def clear(self):
+        """Tamponu boşalt"""
+        self._parts = []
+        self._starts = []
+        self._pages = []
+        self._length = 0
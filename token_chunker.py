@@ -0,0 +1,183 @@
+"""
+Token Bütçeli Parçalama
+Bölüm metinlerini cümlelere ayırır ve cümleleri embedding modelinin token
+penceresine sığacak şekilde paketler.
+
+- Türkçe cümle sınırları: kısaltmalar (vb., bkz., Dr., M.Ö.), sıra sayıları
+  ("19. yüzyıl", "1. Dünya Savaşı") ve küçük harfle devam eden metin sınır sayılmaz
+- Parça boyutu karakterle değil, modelin kendi tokenizer'ıyla ölçülen token sayısıyla belirlenir
+- Örtüşme yarım kelime yerine tam cümlelerle yapılır
+- Başlık yolu ("I. ÜNİTE > A. Konu > 1. Alt konu") bölüm başlıklarından izlenir
+"""
+
+import re
+from bisect import bisect_right
+from typing import List, Optional, Sequence, Tuple
+
+# Cümle sonu adayı: noktalama (+ kapanan tırnak / parantez) + boşluk
+_BOUNDARY_PATTERN = re.compile(r'[.!?…]+["\'”’»)\]]*\s+')
+_PARAGRAPH_PATTERN = re.compile(r'\n\s*\n')
+_WORD_PATTERN = re.compile(r'\S+')
+
+# Noktadan sonra cümle bitmeyen kısaltmalar (küçük harfle, noktasız)
+ABBREVIATIONS = frozenset({
+    "vb", "vs", "vd", "bkz", "örn", "krş", "bk", "çev", "haz", "yay", "ed",
+    "dr", "prof", "doç", "yrd", "öğr", "gör", "av", "müh", "sn", "st",
+    "no", "nu", "ss", "sy", "yy", "sf", "tel", "hz", "şek", "tab",
+    "şub", "mar", "nis", "tem", "ağu", "eyl", "eki", "kas", "ara",
+})
+
+# Başlık işareti: "1.1", "1.", "IV.", "A."
+_HEADING_MARKER = re.compile(r'\s*(?:(?P<sub>\d+\.\d+)\.?|(?P<number>\d+)\.|(?P<roman>[IVX]+)\.|(?P<letter>[A-Z])\.)\s')
+HEADING_TITLE_CHARS = 80
+
+
+def _is_sentence_end(text: str, dot: int, next_start: int) -> bool:
+    """text[dot] noktalaması gerçek bir cümle sonu mu (next_start: sonraki cümlenin ilk karakteri)"""
+    if next_start >= len(text):
+        return True
+
+    # Küçük harfle devam eden metin aynı cümledir; satır sonundaki nokta ise cümleyi bitirir
+    same_line = '\n' not in text[dot:next_start]
+    continues = text[next_start].islower() and same_line
+
+    punctuation = text[dot:next_start]
+    if '…' in punctuation or '...' in punctuation:
+        return not continues  # "Evet… bitti." tek cümledir
+    if text[dot] != '.':
+        return True  # ! ?
+
+    word_start = max(text.rfind(' ', 0, dot), text.rfind('\n', 0, dot)) + 1
+    word = text[word_start:dot].lstrip('("\'“‘«')
+    if not word:
+        return not continues
+    if word.isdigit():
+        # Sayı + nokta + kelime sıra sayısı veya tarihtir ("1. Dünya Savaşı", "12. Ünite",
+        # "1923. Cumhuriyet ilan edildi"); uzun sayılar sadece satır sonunda cümleyi bitirir
+        if len(word) <= 2:
+            return False
+        return not (same_line and text[next_start].isalpha())
+    if '.' in word:
+        # Baş harfler ve noktalı kısaltmalar: "M.Ö", "T.B.M.M", "A.B.D"
+        return not all(len(part) <= 2 for part in word.split('.'))
+    if len(word) == 1 and word.isalpha():
+        return False  # Baş harf: "M. Kemal"
+    return not continues and word.lower() not in ABBREVIATIONS
+
+
+def split_sentences(text: str) -> List[Tuple[int, int]]:
+    """
+    Metni Türkçe cümlelere ayır
+
+    Returns:
+        List[Tuple[int, int]]: Cümlelerin metindeki [başlangıç, bitiş) aralıkları (boşluksuz)
+    """
+    spans = []
+    start = 0
+
+    def emit(end: int):
+        segment = text[start:end]
+        stripped = segment.strip()
+        if stripped:
+            left = start + len(segment) - len(segment.lstrip())
+            spans.append((left, left + len(stripped)))
+
+    boundaries = []
+    for match in _BOUNDARY_PATTERN.finditer(text):
+        if _is_sentence_end(text, match.start(), match.end()):
+            boundaries.append(match.start() + len(match.group().rstrip()))
+    boundaries.extend(match.start() for match in _PARAGRAPH_PATTERN.finditer(text))
+
+    for end in sorted(set(boundaries)):
+        if end > start:
+            emit(end)
+            start = end
+    emit(len(text))
+    return spans
+
+
+def split_words(text: str, start: int, end: int) -> List[Tuple[int, int]]:
+    """[start, end) aralığındaki kelimelerin aralıkları"""
+    return [match.span() for match in _WORD_PATTERN.finditer(text, start, end)]
+
+
+def pack_spans(lengths: Sequence[int], budget: int, overlap: int) -> List[Tuple[int, int]]:
+    """
+    Ardışık parçaları (cümleleri) token bütçesine sığacak gruplara paketle
+
+    Args:
+        lengths: Parçaların token sayıları
+        budget: Grup başına en fazla token
+        overlap: Bir önceki grubun sonundan tekrarlanacak en fazla token (tam cümleler)
+
+    Returns:
+        List[Tuple[int, int]]: Grupların [ilk, son) parça sıra numaraları
+    """
+    groups = []
+    start = 0
+    total = 0
+    for i, length in enumerate(lengths):
+        if i > start and total + length > budget:
+            groups.append((start, i))
+            # Örtüşme: önceki grubun son cümleleri (ilerleme için grubun ilk cümlesi hariç)
+            new_start = i
+            carried = 0
+            while (new_start - 1 > start and carried + lengths[new_start - 1] <= overlap
+                   and carried + lengths[new_start - 1] + length <= budget):
+                new_start -= 1
+                carried += lengths[new_start]
+            start = new_start
+            total = carried
+        total += length
+    if start < len(lengths):
+        groups.append((start, len(lengths)))
+    return groups
+
+
+def heading_level(text: str) -> Optional[int]:
+    """
+    Bölüm başındaki başlık işaretinin seviyesi
+    IV. -> 1, A. -> 2, 1. -> 3, 1.1 -> 4; başlık yoksa None
+    """
+    match = _HEADING_MARKER.match(text)
+    if match is None:
+        return None
+    return {"roman": 1, "letter": 2, "number": 3, "sub": 4}[match.lastgroup]
+
+
+def update_heading_path(stack: List[Tuple[int, str]], section: str) -> str:
+    """
+    Bölüm bir başlıkla başlıyorsa başlık yığınını güncelle ve başlık yolunu döndür
+
+    Args:
+        stack: (seviye, başlık) listesi; yerinde güncellenir
+        section: Bölüm metni
+
+    Returns:
+        str: "Üst başlık > Alt başlık" biçiminde yol (başlık yoksa "")
+    """
+    level = heading_level(section)
+    if level is not None:
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        title = " ".join(section.strip().split('\n', 1)[0].split())
+        stack.append((level, title[:HEADING_TITLE_CHARS]))
+    return " > ".join(title for _, title in stack)
+
+
+def page_range(pages: Sequence[Tuple[int, int]], start: int, end: int) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Bölüm içindeki [start, end) aralığının kapsadığı sayfalar
+
+    Args:
+        pages: (bölümdeki başlangıç offset'i, sayfa numarası) listesi, offset'e göre sıralı
+
+    Returns:
+        Tuple: (ilk sayfa, son sayfa), sayfa bilgisi yoksa (None, None)
+    """
+    if not pages:
+        return None, None
+    offsets = [offset for offset, _ in pages]
+    first = max(bisect_right(offsets, start) - 1, 0)
+    last = max(bisect_right(offsets, max(end - 1, start)) - 1, 0)
+    return pages[first][1], pages[last][1]